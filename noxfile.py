@@ -13,6 +13,7 @@ MARKDOWN_FILES = ["README.md", "docs/", "src/", "tests/"]
 SORT_FILE_EXE = ["python3", "scripts/sort_file.py"]
 WHITELIST_FILE = ["whitelist.txt"]
 CI_ENV_VARS = ["CI"]
+RELEASE_ENV_VAR = "RELEASE"
 FLAKE_PLUGINS = [
     "darglint",
     "flake8-2020",
@@ -66,6 +67,15 @@ def default(session: nox.Session) -> None:
     session.notify("test")
     session.notify("lint")
     session.notify("mypy")
+    session.notify("docs(build)")
+    session.notify("docs(test)")
+    if getenv(RELEASE_ENV_VAR, False):
+        session.notify("docs(pdf)")
+    session.notify("build")
+
+
+@nox.session(python=False)
+def release(session: nox.Session) -> None:
     session.notify("docs(build)")
     session.notify("docs(test)")
     session.notify("docs(pdf)")
@@ -167,7 +177,11 @@ def test_all_python(session: nox.Session) -> None:
 def docs(session: nox.Session, command: str) -> None:
     session.install("sphinx")
     session.install("-e", ".[docs]")
-    session.run("python3", "-m", "sphinx.cmd.build", "-b", command, "-d", "docs/_build/doctrees", "docs/", f"docs/_build/{command}", env={'AUTODOCDIR': 'api'})
+    session.run("python3", "-m", "sphinx.cmd.build", "-j", "auto", "-b", command, "-d", "docs/_build/doctrees", "docs/", f"docs/_build/{command}", env={'AUTODOCDIR': 'api'})
+
+@nox.session(python=False)
+def watch_templates(session: nox.Session) -> None:
+    session.run("python3", "scripts/watch_templates.py", *session.posargs)
 
 @nox.session
 def build(session: nox.Session) -> None:
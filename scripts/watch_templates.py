@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Keep a sample project rendered while editing the templates.
+
+The sample project is generated once with ``putup``. Then the templates are polled for
+changes: a changed template is formatted with ``template_preformat.py`` and only the
+files of the sample project rendered from it (as recorded in its ``.jaustinpage.lock``)
+are rendered again, printing a diff of each of them.
+
+Usage: ``python scripts/watch_templates.py [--interval SECONDS] [-- PUTUP_ARGS ...]``
+"""
+import argparse
+import difflib
+import logging
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from shutil import rmtree
+from string import Template
+from typing import Dict, List, Optional
+
+from pyscaffold import api, cli
+from pyscaffold.actions import ScaffoldOpts
+
+from pyscaffoldext.jaustinpage import templates
+from pyscaffoldext.jaustinpage.lockfile import read_lockfile
+from pyscaffoldext.jaustinpage.render import CompiledTemplate
+
+TEMPLATES_DIR = Path(templates.__file__).parent
+SAMPLE_DIR = Path("build") / "watch" / "myproject"
+
+
+def generate(sample: Path, putup_args: List[str]) -> ScaffoldOpts:
+    """Generate the sample project from scratch.
+
+    :param sample: project path
+    :param putup_args: extra ``putup`` arguments
+    :returns: the scaffold options the project was rendered with
+    """
+    rmtree(sample, ignore_errors=True)
+    args = [str(sample), "--no-config", "--jaustinpage", *putup_args]
+    opts = cli.parse_args(args)
+    opts["config_files"] = api.NO_CONFIG
+    _, opts = api.create_project(opts)
+    return opts
+
+
+def outputs_by_template(sample: Path) -> Dict[str, List[str]]:
+    """Files of the sample project per template they are rendered from.
+
+    :param sample: project path
+    :returns: paths relative to ``sample``, per template name
+    """
+    outputs = defaultdict(list)
+    for path, (name, _, _) in read_lockfile(sample).items():
+        if name:
+            outputs[name].append(path)
+    return outputs
+
+
+def preformat(path: Path) -> None:
+    """Format a single template with ``template_preformat.py``, if it is installed.
+
+    :param path: template path
+    """
+    try:
+        import template_preformat  # noqa: I900
+    except ImportError as ex:
+        logging.info("Not formatting %s: %s", path.name, ex)
+        return
+    template_preformat.process_file(path)
+
+
+def rerender(sample: Path, outputs: List[str], path: Path, opts: ScaffoldOpts) -> None:
+    """Render the outputs of a template again and print their diff.
+
+    :param sample: project path
+    :param outputs: paths rendered from the template, relative to ``sample``
+    :param path: template path
+    :param opts: scaffold options of the sample project
+    """
+    compiled = CompiledTemplate(Template(path.read_text()))
+    for output in outputs:
+        output_path = sample / output
+        old = output_path.read_text() if output_path.is_file() else ""
+        new = compiled(opts)
+        diff = difflib.unified_diff(
+            old.splitlines(keepends=True),
+            new.splitlines(keepends=True),
+            f"a/{output}",
+            f"b/{output}",
+        )
+        sys.stdout.writelines(diff)
+        output_path.write_text(new)
+    print(f"re-rendered {', '.join(outputs)} from {path.name}")  # noqa: T001
+
+
+def mtimes() -> Dict[Path, int]:
+    """Modification times of the templates.
+
+    :returns: ``st_mtime_ns`` per template path
+    """
+    return {path: path.stat().st_mtime_ns for path in TEMPLATES_DIR.glob("*.template")}
+
+
+def watch(
+    sample: Path, opts: ScaffoldOpts, interval: float, polls: Optional[int] = None
+) -> None:
+    """Poll the templates and re-render the outputs of the changed ones.
+
+    :param sample: project path
+    :param opts: scaffold options of the sample project
+    :param interval: seconds between polls
+    :param polls: stop after this many polls, never by default
+    """
+    outputs = outputs_by_template(sample)
+    seen = mtimes()
+    while polls is None or polls > 0:
+        time.sleep(interval)
+        polls = polls if polls is None else polls - 1
+        current = mtimes()
+        for path in sorted(p for p, mtime in current.items() if seen.get(p) != mtime):
+            preformat(path)
+            name = path.name[: -len(".template")]
+            if name in outputs:
+                rerender(sample, outputs[name], path, opts)
+            else:
+                message = f"{path.name} changed, no file of the sample uses it"
+                print(message)  # noqa: T001
+        seen = mtimes()  # preformat may have rewritten the templates
+
+
+def main() -> None:
+    """Generate the sample project and watch the templates."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sample", type=Path, default=SAMPLE_DIR, help="project path")
+    parser.add_argument("--interval", type=float, default=0.2, help="poll interval")
+    parser.add_argument("putup_args", nargs="*", help="extra putup arguments")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    opts = generate(args.sample, args.putup_args)
+    print(f"watching {TEMPLATES_DIR}, sample project in {args.sample}")  # noqa: T001
+    try:
+        watch(args.sample, opts, args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
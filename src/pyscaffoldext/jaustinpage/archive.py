@@ -0,0 +1,282 @@
+"""Stream generated projects into an archive instead of the filesystem.
+
+With ``--jaustinpage-archive FILE``, the structure of the project (the templated
+files, the configured ``setup.cfg`` and ``pyproject.toml``, PyScaffold's files and the
+lockfile) is rendered straight into ``FILE``, under a directory named like the
+project, e.g. ``my_project/setup.cfg``. No file or directory of the project is written,
+and the rest of the pipeline runs as with ``--pretend``, so there is no git repository
+either.
+
+The format follows the suffix of ``FILE``: ``.zip``, ``.tar``, ``.tar.gz``,
+``.tar.bz2``, ``.tar.xz`` or ``.tar.zst``. zstd needs Python 3.14 or the
+``zstandard`` package, e.g. ``pip install pyscaffoldext-jaustinpage[zstd]``. Projects
+generated by the same process share the archive, which is completed when the process
+exits, or by :func:`close_archives`.
+"""
+import atexit
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import IO, Dict, Iterator, Optional, Set, Tuple
+
+from pyscaffold.actions import ActionParams, ScaffoldOpts, Structure
+from pyscaffold.exceptions import DirectErrorForUser
+from pyscaffold.structure import reify_content, resolve_leaf
+
+from pyscaffoldext.jaustinpage.host_options import host_key
+from pyscaffoldext.jaustinpage.lockfile import (
+    LOCKFILE,
+    LockEntries,
+    lock_entry,
+    lockfile_content,
+)
+from pyscaffoldext.jaustinpage.render import Deferred
+
+ARCHIVE = host_key("archive")
+# ^  Opts key of ``--jaustinpage-archive``, see :mod:`.host_options`
+
+TAR_MODES = {
+    ".tar": "w|",
+    ".tar.gz": "w|gz",
+    ".tgz": "w|gz",
+    ".tar.bz2": "w|bz2",
+    ".tar.xz": "w|xz",
+    ".tar.zst": "w|",
+    ".tzst": "w|",
+}
+"""Stream modes of :func:`tarfile.open` per suffix, zstd is compressed separately."""
+
+ZSTD_SUFFIXES = (".tar.zst", ".tzst")
+
+_LOCK = threading.Lock()
+_ARCHIVES: Dict[Path, "Archive"] = {}
+"""Archives open for writing, completed on exit."""
+
+Member = Tuple[str, Optional[str]]
+"""Archive member: POSIX path, with a trailing ``/`` and no content for directories."""
+
+
+class ArchiveError(DirectErrorForUser):
+    """The projects cannot be written to the archive."""
+
+
+class Archive(ABC):
+    """Archive open for writing, with the projects generated so far.
+
+    :param path: archive file
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.projects: Set[str] = set()
+
+    def add_project(self, name: str, members: Iterator[Member]) -> None:
+        """Add the members of a project.
+
+        :param name: directory of the project in the archive
+        :param members: members, relative to the project directory
+        :raises ArchiveError: when the archive already has a project with that name
+        """
+        if name in self.projects:
+            raise ArchiveError(f"{name} is already in {self.path}")
+        self.projects.add(name)
+        mtime = time.time()
+        self.add(f"{name}/", None, mtime)
+        for member, content in members:
+            self.add(f"{name}/{member}", content, mtime)
+
+    @abstractmethod
+    def add(self, name: str, content: Optional[str], mtime: float) -> None:
+        """Add a member.
+
+        :param name: POSIX path, ending with ``/`` for directories
+        :param content: file content, ``None`` for directories
+        :param mtime: modification time
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Complete the archive."""
+
+
+class TarArchive(Archive):
+    """Tar archive, written as a stream.
+
+    :param path: archive file
+    :param mode: stream mode of :func:`tarfile.open`, see :data:`TAR_MODES`
+    :param fileobj: compressed stream to write the tar stream to, if any
+    """
+
+    def __init__(self, path: Path, mode: str, fileobj: Optional[IO[bytes]] = None):
+        super().__init__(path)
+        self.fileobj = fileobj
+        self.tar = tarfile.open(str(path), mode, fileobj=fileobj)
+
+    def add(self, name: str, content: Optional[str], mtime: float) -> None:
+        """Add a member, see :meth:`Archive.add`.
+
+        :param name: POSIX path, ending with ``/`` for directories
+        :param content: file content, ``None`` for directories
+        :param mtime: modification time
+        """
+        info = tarfile.TarInfo(name.rstrip("/"))
+        info.mtime = int(mtime)
+        if content is None:
+            info.type, info.mode = tarfile.DIRTYPE, 0o755
+            self.tar.addfile(info)
+        else:
+            data = content.encode()
+            info.size, info.mode = len(data), 0o644
+            self.tar.addfile(info, io.BytesIO(data))
+
+    def close(self) -> None:
+        """Complete the archive."""
+        self.tar.close()
+        if self.fileobj is not None:
+            self.fileobj.close()
+
+
+class ZipArchive(Archive):
+    """Zip archive, deflated.
+
+    :param path: archive file
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+
+    def add(self, name: str, content: Optional[str], mtime: float) -> None:
+        """Add a member, see :meth:`Archive.add`.
+
+        :param name: POSIX path, ending with ``/`` for directories
+        :param content: file content, ``None`` for directories
+        :param mtime: modification time
+        """
+        info = zipfile.ZipInfo(name, time.localtime(mtime)[:6])
+        if content is None:
+            info.external_attr = (0o40755 << 16) | 0x10  # directory flag of MS-DOS
+            self.zip.writestr(info, b"")
+        else:
+            info.external_attr = 0o100644 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self.zip.writestr(info, content)
+
+    def close(self) -> None:
+        """Complete the archive."""
+        self.zip.close()
+
+
+def zstd_writer(path: Path) -> IO[bytes]:
+    """Open a file for writing a zstd compressed stream.
+
+    :param path: compressed file
+    :returns: writable binary stream
+    :raises ArchiveError: without zstd support
+    """
+    try:
+        from compression import zstd  # type: ignore  # Python 3.14
+
+        return zstd.ZstdFile(path, "w")  # pragma: no cover
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ArchiveError(
+            f"writing {path} needs Python 3.14 or the zstandard package, "
+            "e.g. pip install pyscaffoldext-jaustinpage[zstd]"
+        ) from None
+    return zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+
+
+def open_archive(path: Path) -> Archive:
+    """Open an archive for writing, in the format given by its suffix.
+
+    :param path: archive file
+    :returns: the archive
+    :raises ArchiveError: for an unknown suffix, or without zstd support
+    """
+    name = path.name.lower()
+    formats = [".zip", *TAR_MODES]
+    suffix = next((suffix for suffix in formats if name.endswith(suffix)), None)
+    if suffix is None:
+        raise ArchiveError(
+            f"unknown archive format of {path}, use one of {', '.join(formats)}"
+        )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if suffix == ".zip":
+        return ZipArchive(path)
+    fileobj = zstd_writer(path) if suffix in ZSTD_SUFFIXES else None
+    return TarArchive(path, TAR_MODES[suffix], fileobj)
+
+
+def close_archives() -> None:
+    """Complete the archives written by this process."""
+    with _LOCK:
+        while _ARCHIVES:
+            _ARCHIVES.popitem()[1].close()
+
+
+atexit.register(close_archives)
+
+
+def members(
+    struct: Structure, opts: ScaffoldOpts, records: LockEntries, prefix: str = ""
+) -> Iterator[Member]:
+    """Render the members of a project structure, without calling the file ops.
+
+    :param struct: project structure
+    :param opts: scaffold options
+    :param records: lock entries of the :class:`~.render.Deferred` files, filled while
+        the members are rendered
+    :param prefix: directory of ``struct`` in the project, with a trailing ``/``
+    :returns: members of the files and directories
+    """
+    for name, node in struct.items():
+        path = f"{prefix}{name}"
+        if isinstance(node, dict):
+            yield f"{path}/", None
+            yield from members(node, opts, records, f"{path}/")
+            continue
+        content, _ = resolve_leaf(node)
+        if isinstance(content, Deferred):
+            rendered = content.render(opts)
+            records[path] = lock_entry(content.template_name, rendered)
+        else:
+            rendered = reify_content(content, opts)
+        if rendered is not None:
+            yield path, rendered
+
+
+def write_archive(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Write the project into the ``--jaustinpage-archive`` instead of the filesystem.
+
+    Run it right before ``create_structure``, which then creates nothing.
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: project structure
+    :param opts: scaffold options
+    :returns: action params, with an empty structure and ``pretend`` set
+    """
+    path = opts.get(ARCHIVE)
+    if not path or opts.get("pretend"):
+        return struct, opts
+    path = Path(path).absolute()
+    name = Path(os.path.abspath(opts.get("project_path", "."))).name
+    with _LOCK:
+        archive = _ARCHIVES.get(path)
+        if archive is None:
+            archive = _ARCHIVES[path] = open_archive(path)
+        records: LockEntries = {}
+
+        def project() -> Iterator[Member]:
+            yield from members(struct, opts, records)
+            yield LOCKFILE, lockfile_content(records)
+
+        archive.add_project(name, project())
+    return {}, {**opts, "pretend": True}
@@ -0,0 +1,109 @@
+"""Render the managed files of many projects at once, from options given as columns.
+
+Large provisioning runs render the same templates for thousands of projects, whose
+options only differ in a few columns, e.g. ``name``, ``package`` and ``qual_pkg``. The
+options of a batch are a mapping of option name to one value per project, or a CSV
+file with one row per project::
+
+    columns = read_csv("projects.csv")
+    for path, contents in render_files(columns).items():
+        ...  # contents[i] is the content of the file at path for the i-th project
+
+Each template is rendered once per distinct combination of the values of the
+placeholders it uses, and the projects sharing a combination share the rendered string
+by reference. Templates without placeholders in the columns, like ``gitignore``, are
+rendered once per batch. Placeholders without a column are left as they are, like in
+:meth:`~pyscaffoldext.jaustinpage.render.CompiledTemplate.__call__`.
+"""
+import csv
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Sequence, Union
+
+from pyscaffoldext.jaustinpage.extension import ADD_FILES
+from pyscaffoldext.jaustinpage.render import CompiledTemplate
+from pyscaffoldext.jaustinpage.templates import compiled
+
+Columns = Mapping[str, Sequence[object]]
+
+
+def columns_from_rows(rows: Iterable[Mapping[str, object]]) -> Dict[str, List[object]]:
+    """Turn the options of each project into columns.
+
+    :param rows: options per project, with the keys of the first one
+    :returns: one list of values per option
+    :raises KeyError: when a project misses an option of the first one
+    """
+    columns: Dict[str, List[object]] = {}
+    for index, row in enumerate(rows):
+        if not index:
+            columns = {key: [] for key in row}
+        for key, values in columns.items():
+            values.append(row[key])
+    return columns
+
+
+def read_csv(path: Union[str, Path]) -> Dict[str, List[object]]:
+    """Read the options of a batch, one project per row, with a header row.
+
+    :param path: CSV file
+    :returns: one list of values per column
+    """
+    with open(path, newline="") as csv_file:
+        return columns_from_rows(csv.DictReader(csv_file))
+
+
+def batch_size(columns: Columns) -> int:
+    """Number of projects in a batch.
+
+    :param columns: options of the batch
+    :returns: length of the columns
+    :raises ValueError: when the columns do not have the same length
+    """
+    sizes = {len(values) for values in columns.values()}
+    if len(sizes) > 1:
+        lengths = ", ".join(f"{key}: {len(values)}" for key, values in columns.items())
+        raise ValueError(f"columns of different lengths ({lengths})")
+    return sizes.pop() if sizes else 0
+
+
+def render_batch(template: CompiledTemplate, columns: Columns) -> List[str]:
+    """Render a template for every project of a batch.
+
+    :param template: compiled template
+    :param columns: options of the batch
+    :returns: one content per project, the same string object for the projects with
+        the same values for the placeholders of the template
+    :raises ValueError: when the columns do not have the same length
+    """
+    size = batch_size(columns)
+    keys = sorted(template.placeholders.intersection(columns))
+    if not keys:
+        return [template({})] * size
+    rendered: Dict[tuple, str] = {}
+    contents = []
+    for values in zip(*(columns[key] for key in keys)):
+        combination = tuple(map(str, values))  # rendering uses str() of the values
+        content = rendered.get(combination)
+        if content is None:
+            content = rendered[combination] = template(dict(zip(keys, combination)))
+        contents.append(content)
+    return contents
+
+
+def render_files(
+    columns: Columns, paths: Iterable[str] = ADD_FILES
+) -> Dict[str, List[str]]:
+    """Render the files added by the extension for every project of a batch.
+
+    :param columns: options of the batch
+    :param paths: project relative paths of the files, rendered from
+        ``templates/<name>.template`` like in
+        :func:`~pyscaffoldext.jaustinpage.extension.add_files`
+    :returns: one content per project, per path
+    :raises ValueError: when the columns do not have the same length
+    """
+    batch_size(columns)
+    return {
+        path: render_batch(compiled(path.split("/")[-1].strip(".")), columns)
+        for path in paths
+    }
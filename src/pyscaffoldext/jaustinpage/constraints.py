@@ -0,0 +1,322 @@
+"""Pinned ``constraints.txt`` and build requirements of the generated projects.
+
+The packages of the ``[options.extras_require]`` groups are resolved once with
+``pip install --dry-run --report`` and the resolution is cached per set of packages,
+Python version and platform, under ``$XDG_CACHE_HOME/pyscaffoldext-jaustinpage``. Every
+project generated afterwards gets the cached pins without resolving anything again.
+
+The tox envs and nox sessions of the generated projects run several Python versions,
+and a resolution only holds for the interpreter that made it. The requirements are
+resolved by each of the :data:`TARGET_PYTHONS` installed on the host (and by the running
+interpreter), and each pin is only for the Python version it was resolved for, followed
+by the sha256 hash of the resolved distribution as a comment::
+
+    flake8==7.4.1 ; python_version == "3.11"  # sha256:78480274a6d7289d9cb8eafeda241f...
+
+pip skips the pins of the other versions, so an interpreter without a resolution, e.g.
+one not installed on the host that generated the project, installs unpinned versions.
+
+pip turns hash-checking mode on for *every* requirement as soon as a constraints file
+contains ``--hash`` options, which unpinned requirements like ``-e .[testing]`` cannot
+satisfy. The hashes are comments, so the file can be used with ``pip install -c``.
+Without network access pip gives up after one attempt and the file is generated without
+pins. Failed resolutions are cached as well, so the following runs do not try again
+until :data:`FAILURE_TTL` has passed.
+
+The build requirements are pinned the same way, with ``--hash`` options: the file lists
+every distribution to install, so pip can check all of them while preparing the
+environment of ``python -m build --no-isolation``. Hash-checking mode applies to the
+whole file, even to the requirements that a marker skips, so a single file cannot pin
+several Python versions. Each installed interpreter gets its own file instead, named
+after its Python version and the platform, e.g.
+``build-requirements/py39-linux-x86_64.txt``, and ``scripts/pip_install.py
+--build-requirements`` installs the file of the running interpreter, or the unpinned
+requirements without one. Interpreters without a hash for every build requirement, e.g.
+because they could not resolve them, get no file, see :func:`hash_checked`.
+"""
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess  # noqa: S404
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from pyscaffold.log import logger
+
+from pyscaffoldext.jaustinpage import __version__
+
+CONSTRAINTS = "constraints.txt"
+BUILD_REQUIREMENTS = "build-requirements"
+"""Directory of the build requirements files, see :func:`build_requirements_name`."""
+
+PYTHON = ".".join(map(str, sys.version_info[:2]))
+"""Python version of the running interpreter."""
+
+TARGET_PYTHONS = ("3.6", "3.7", "3.8", "3.9", "3.10")
+"""Python versions of the tox envs and nox sessions of the generated projects."""
+
+INTERPRETER_TIMEOUT = 10
+"""Seconds an interpreter has to start, see :func:`interpreter`."""
+
+RESOLVE_OPTIONS = ["--retries", "0", "--timeout", "5"]
+"""Options of ``pip install`` that make a resolution without network fail fast."""
+
+FAILURE_TTL = 24 * 60 * 60
+"""Seconds a failed resolution is remembered, so offline runs do not retry it."""
+
+PLATFORM = f"{sys.platform}-{platform.machine().lower()}"
+"""Platform of the running interpreter, as in the names of the build requirements."""
+
+
+class Pin(NamedTuple):
+    """Resolved distribution."""
+
+    name: str
+    version: str
+    sha256: str
+
+
+def cache_dir() -> Path:
+    """Directory of the cached resolutions.
+
+    :returns: path, honouring ``XDG_CACHE_HOME``
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "pyscaffoldext-jaustinpage" / "constraints"
+
+
+def pythons() -> List[str]:
+    """Python versions to resolve the requirements for.
+
+    :returns: the :data:`TARGET_PYTHONS` and :data:`PYTHON`, oldest first
+    """
+    versions = {*TARGET_PYTHONS, PYTHON}
+    return sorted(versions, key=lambda version: tuple(map(int, version.split("."))))
+
+
+@lru_cache(maxsize=None)
+def interpreter(python: str) -> Optional[str]:
+    """Interpreter of a Python version on this host.
+
+    An executable on the ``PATH`` only counts if it runs: the shims of pyenv or asdf
+    exist for every version they know, and fail for the versions not installed.
+    :param python: Python version, e.g. ``"3.8"``
+    :returns: executable, ``None`` if the version is not installed
+    """
+    if python == PYTHON:
+        return sys.executable
+    executable = shutil.which(f"python{python}")
+    if executable is None:
+        return None
+    try:
+        subprocess.run(  # noqa: S603
+            [executable, "-c", "pass"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=INTERPRETER_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return executable
+
+
+def installed_pythons() -> List[str]:
+    """Python versions of :func:`pythons` that have an interpreter on this host.
+
+    :returns: Python versions, oldest first
+    """
+    return [python for python in pythons() if interpreter(python)]
+
+
+def build_requirements_name(python: str) -> str:
+    """Name of the build requirements file of a Python version, on this platform.
+
+    ``scripts/pip_install.py`` of the generated projects builds the same name.
+    :param python: Python version, e.g. ``"3.10"``
+    :returns: file name, e.g. ``py310-linux-x86_64.txt``
+    """
+    return f"py{python.replace('.', '')}-{PLATFORM}.txt"
+
+
+def resolution_key(requirements: Sequence[str], python: str = PYTHON) -> str:
+    """Key of a resolution: what it depends on besides the package index.
+
+    :param requirements: requirement specifiers
+    :param python: Python version they are resolved for
+    :returns: hex digest
+    """
+    environment = [python, sys.platform, platform.machine()]
+    content = "\n".join([*environment, *sorted(requirements)])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def resolve(requirements: Sequence[str], executable: str = sys.executable) -> List[Pin]:
+    """Resolve requirements with pip, without installing anything.
+
+    :param requirements: requirement specifiers
+    :param executable: interpreter whose pip resolves them
+    :returns: pins of every distribution pip would install, sorted by name
+    """
+    with TemporaryDirectory() as tmp:
+        report = Path(tmp) / "report.json"
+        subprocess.run(  # noqa: S603
+            [
+                executable,
+                "-m",
+                "pip",
+                "install",
+                "--quiet",
+                "--dry-run",
+                "--ignore-installed",
+                "--report",
+                str(report),
+                *RESOLVE_OPTIONS,
+                *requirements,
+            ],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        installs = json.loads(report.read_text())["install"]
+    pins = []
+    for item in installs:
+        hashes = item["download_info"].get("archive_info", {}).get("hashes", {})
+        name, version = item["metadata"]["name"], item["metadata"]["version"]
+        pins.append(Pin(name.lower(), version, hashes.get("sha256", "")))
+    return sorted(pins)
+
+
+def format_constraints(
+    pins: Mapping[str, Sequence[Pin]], requirements: Sequence[str]
+) -> str:
+    """Content of ``constraints.txt``.
+
+    :param pins: resolved distributions, per Python version
+    :param requirements: requirement specifiers they were resolved from
+    :returns: file content
+    """
+    versions = ", ".join(pins) or "no Python version"
+    lines = [
+        f"# Generated by pyscaffoldext-jaustinpage {__version__} on {sys.platform},"
+        f" from {len(requirements)} requirements, for {versions}.",
+        "# Use with `pip install -c constraints.txt ...`, pip applies the pins of the",
+        "# running Python version only. The hashes are comments.",
+    ]
+    for python, python_pins in pins.items():
+        marker = f' ; python_version == "{python}"'
+        for pin in python_pins:
+            digest = f"  # sha256:{pin.sha256}" if pin.sha256 else ""
+            lines.append(f"{pin.name}=={pin.version}{marker}{digest}")
+    return "\n".join(lines) + "\n"
+
+
+def format_requirements(
+    pins: Sequence[Pin], requirements: Sequence[str], python: str = PYTHON
+) -> str:
+    """Content of a build requirements file, a hash-checked requirements file.
+
+    Installing it with ``pip install -r`` checks the hash of every distribution, when
+    every pin has one. Without pins, the requirements are listed as they are.
+    :param pins: resolved distributions
+    :param requirements: requirement specifiers they were resolved from
+    :param python: Python version they were resolved for
+    :returns: file content
+    """
+    lines = [
+        f"# Generated by pyscaffoldext-jaustinpage {__version__} for Python {python}"
+        f" on {PLATFORM}, from {len(requirements)} requirements.",
+        "# Used by `python scripts/pip_install.py --build-requirements`, the hashes"
+        " are checked.",
+    ]
+    hashed = bool(pins) and all(pin.sha256 for pin in pins)
+    for pin in pins:
+        digest = f" --hash=sha256:{pin.sha256}" if hashed else ""
+        lines.append(f"{pin.name}=={pin.version}{digest}")
+    if not pins:
+        lines += sorted(requirements)
+    return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=None)
+def _cached_pins(requirements: Tuple[str, ...], python: str) -> Tuple[Pin, ...]:
+    """Read the cached resolution, or resolve and cache it.
+
+    Failures are cached too, for :data:`FAILURE_TTL` seconds.
+    :param requirements: sorted requirement specifiers
+    :param python: Python version to resolve them for
+    :returns: pins, none if the requirements cannot be resolved
+    """
+    path = cache_dir() / f"{resolution_key(requirements, python)}.json"
+    if path.is_file():
+        return tuple(Pin(*pin) for pin in json.loads(path.read_text()))
+    failed = path.with_suffix(".failed")
+    if failed.is_file() and time.time() - failed.stat().st_mtime < FAILURE_TTL:
+        return ()
+    executable = interpreter(python)
+    if executable is None:
+        return ()
+    try:
+        pins = tuple(resolve(requirements, executable))
+    except (OSError, ValueError, KeyError, subprocess.CalledProcessError) as ex:
+        logger.warning("Could not pin the requirements for Python %s: %s", python, ex)
+        failed.parent.mkdir(parents=True, exist_ok=True)
+        failed.touch()
+        return ()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.{os.getpid()}")
+    partial.write_text(json.dumps(pins))
+    os.replace(partial, path)
+    return pins
+
+
+def pins(requirements: Sequence[str], python: str = PYTHON) -> Tuple[Pin, ...]:
+    """Resolve requirements once per set of requirements, see :func:`resolve`.
+
+    :param requirements: requirement specifiers
+    :param python: Python version to resolve them for
+    :returns: pins, none if the requirements cannot be resolved, or if the Python
+        version is not installed
+    """
+    return _cached_pins(tuple(sorted(set(requirements))), python)
+
+
+def constraints(requirements: Sequence[str]) -> str:
+    """Content of ``constraints.txt``, resolved once per set of requirements.
+
+    :param requirements: requirement specifiers
+    :returns: file content, with the pins of each Python version they were resolved for
+    """
+    resolved = {python: pins(requirements, python) for python in pythons()}
+    resolved = {python: found for python, found in resolved.items() if found}
+    return format_constraints(resolved, sorted(set(requirements)))
+
+
+def hash_checked(requirements: Sequence[str], python: str = PYTHON) -> bool:
+    """Whether every distribution of the requirements is pinned with its hash.
+
+    Only then a build requirements file is worth generating: pip would install the
+    requirements of any other file without checking them.
+    :param requirements: requirement specifiers
+    :param python: Python version to resolve them for
+    :returns: ``True`` if :func:`build_requirements` has a hash for every pin
+    """
+    found = pins(requirements, python)
+    return bool(found) and all(pin.sha256 for pin in found)
+
+
+def build_requirements(requirements: Sequence[str], python: str = PYTHON) -> str:
+    """Content of a build requirements file, resolved once per set of requirements.
+
+    :param requirements: requirement specifiers
+    :param python: Python version to resolve them for
+    :returns: file content, unpinned if the requirements cannot be resolved
+    """
+    requirements = sorted(set(requirements))
+    return format_requirements(pins(requirements, python), requirements, python)
@@ -0,0 +1,397 @@
+"""Find repositories generated with ``--jaustinpage`` that drifted from the templates.
+
+Each repository is compared against what the current version of the extension would
+generate:
+
+- the files of :data:`~pyscaffoldext.jaustinpage.extension.ADD_FILES` by hash, with the
+  expected content rendered once per distinct set of options,
+- the ``setup.cfg`` sections and ``pyproject.toml`` tables managed by
+  :func:`~pyscaffoldext.jaustinpage.extension.configure_setup_cfg` and
+  :func:`~pyscaffoldext.jaustinpage.extension.configure_pyproject_toml`, key by key.
+
+Repositories are scanned in parallel and the result is a JSON report, e.g.::
+
+    jaustinpage-drift --workers 16 "~/github/*" > drift.json
+
+With ``--update-diff``, the report has the keys of every ``setup.cfg`` section and
+``pyproject.toml`` table that ``putup --update --force`` would add, remove or change,
+see :func:`update_diff`. Nothing is written.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import toml
+from configupdater import ConfigUpdater
+from pyscaffold.actions import ScaffoldOpts, Structure
+from pyscaffold.extensions.namespace import prepare_namespace
+from pyscaffold.structure import reify_content, resolve_leaf
+
+from pyscaffoldext.jaustinpage.extension import (
+    ADD_FILES,
+    configure_pyproject_toml,
+    configure_setup_cfg,
+)
+from pyscaffoldext.jaustinpage.preflight import define_project
+from pyscaffoldext.jaustinpage.render import Deferred
+from pyscaffoldext.jaustinpage.templates import compiled
+
+Report = Dict[str, Any]
+Tables = Dict[str, Dict[str, Any]]
+
+UNMANAGED_FILES = {"whitelist.txt"}
+"""Files that are expected to be edited by hand after generation."""
+
+SETUP_CFG_SECTIONS = ["flake8", "coverage.run", "coverage.paths", "coverage.report"]
+"""``setup.cfg`` sections managed by :func:`configure_setup_cfg`."""
+
+REPORT_KEYS = ["files", "setup.cfg", "pyproject.toml", "error"]
+"""Report entries that mean a repository drifted when not empty."""
+
+DIFF_KINDS = ["added", "removed", "changed"]
+"""Kinds of key changes of :func:`section_diff`."""
+
+
+def read_opts(root: Path) -> ScaffoldOpts:
+    """Recover the scaffold options of a generated repository from its setup.cfg.
+
+    :param root: repository root
+    :returns: the options that influence the managed files
+    """
+    setup_cfg = ConfigUpdater()
+    setup_cfg.read(str(root / "setup.cfg"))
+    pyscaffold = setup_cfg["pyscaffold"].to_dict()
+    opts: ScaffoldOpts = {
+        k: v for k, v in pyscaffold.items() if k.startswith("jaustinpage")
+    }
+    opts["name"] = setup_cfg["metadata"]["name"].value
+    opts["package"] = pyscaffold["package"]
+    opts["qual_pkg"] = opts["package"]
+    if pyscaffold.get("namespace"):
+        opts["namespace"] = pyscaffold["namespace"]
+        opts["ns_list"] = prepare_namespace(opts["namespace"])
+        opts["qual_pkg"] = f"{opts['ns_list'][-1]}.{opts['package']}"
+    return opts
+
+
+def opts_key(opts: ScaffoldOpts) -> Tuple[Tuple[str, str], ...]:
+    """Hashable representation of the options that templates can use.
+
+    :param opts: scaffold options
+    :returns: sorted tuple of the string options
+    """
+    return tuple(sorted((k, v) for k, v in opts.items() if isinstance(v, str)))
+
+
+@lru_cache(maxsize=None)
+def expected_hashes(key: Tuple[Tuple[str, str], ...]) -> Dict[str, str]:
+    """Render the managed files once per distinct set of options.
+
+    :param key: options, see :func:`opts_key`
+    :returns: sha256 hex digest of the expected content, per file path
+    """
+    opts = dict(key)
+    return {
+        path: sha256(compiled(path.split("/")[-1].strip("."))(opts))
+        for path in ADD_FILES
+        if path not in UNMANAGED_FILES
+    }
+
+
+def sha256(content: str) -> str:
+    """Hash text content as it is written to disk.
+
+    :param content: file content
+    :returns: hex digest
+    """
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def file_drift(root: Path, opts: ScaffoldOpts) -> Dict[str, str]:
+    """Compare the managed files against the expected hashes.
+
+    :param root: repository root
+    :param opts: scaffold options of the repository
+    :returns: ``"missing"`` or ``"drifted"`` per file that does not match
+    """
+    drift = {}
+    for path, expected in expected_hashes(opts_key(opts)).items():
+        file_path = root / path
+        if not file_path.is_file():
+            drift[path] = "missing"
+        elif hashlib.sha256(file_path.read_bytes()).hexdigest() != expected:
+            drift[path] = "drifted"
+    return drift
+
+
+def section_drift(actual: Tables, expected: Tables) -> Dict[str, List[str]]:
+    """Compare sections/tables key by key.
+
+    :param actual: sections found in the repository
+    :param expected: managed sections, as they should be
+    :returns: the keys that are missing, extra or different, per section
+    """
+    drift = {}
+    for section, expected_values in expected.items():
+        actual_values = actual.get(section, {})
+        keys = set(actual_values) | set(expected_values)
+        changed = [k for k in keys if actual_values.get(k) != expected_values.get(k)]
+        if changed:
+            drift[section] = sorted(changed)
+    return drift
+
+
+def section_diff(actual: Tables, expected: Tables) -> Dict[str, Dict[str, List[str]]]:
+    """Compare all the sections/tables key by key.
+
+    :param actual: sections found in the repository
+    :param expected: sections, as an update would write them
+    :returns: the keys that are added, removed or changed, per section
+    """
+    diff = {}
+    for section in sorted(set(actual) | set(expected)):
+        actual_values = actual.get(section, {})
+        expected_values = expected.get(section, {})
+        kinds = {
+            "added": set(expected_values) - set(actual_values),
+            "removed": set(actual_values) - set(expected_values),
+            "changed": {
+                k
+                for k in set(actual_values) & set(expected_values)
+                if actual_values[k] != expected_values[k]
+            },
+        }
+        changes = {kind: sorted(kinds[kind]) for kind in DIFF_KINDS if kinds[kind]}
+        if changes:
+            diff[section] = changes
+    return diff
+
+
+def setup_cfg_tables(
+    content: str, sections: Optional[Iterable[str]] = SETUP_CFG_SECTIONS
+) -> Tables:
+    """Parse the sections of a setup.cfg.
+
+    :param content: setup.cfg content
+    :param sections: sections to parse, all of them with ``None``
+    :returns: the sections, with normalised values
+    """
+    setup_cfg = ConfigUpdater()
+    setup_cfg.read_string(content)
+    return {
+        section: {k: (v or "").strip() for k, v in values.items()}
+        for section, values in setup_cfg.to_dict().items()
+        if sections is None or section in sections
+    }
+
+
+def expected_setup_cfg(content: str, opts: ScaffoldOpts) -> str:
+    """Apply :func:`configure_setup_cfg` to an existing setup.cfg.
+
+    :param content: setup.cfg content
+    :param opts: scaffold options
+    :returns: the setup.cfg as the extension would configure it
+    """
+    setup_cfg = ConfigUpdater()
+    setup_cfg.read_string(content)
+    for section in SETUP_CFG_SECTIONS[1:]:
+        # ^  configure_setup_cfg adds these sections, they cannot exist beforehand
+        if section in setup_cfg:
+            setup_cfg.remove_section(section)
+    return configure_setup_cfg(str(setup_cfg), opts)
+
+
+def pyproject_tables(document: Dict[str, Any], prefix: str = "") -> Tables:
+    """Flatten a TOML document into dotted table names.
+
+    ``["tool.black"]`` and ``[tool.black]`` end up with the same name.
+    :param document: parsed TOML
+    :param prefix: dotted name of ``document``
+    :returns: the values of each table, per dotted table name
+    """
+    tables: Tables = {}
+    values = {}
+    for key, value in document.items():
+        if isinstance(value, dict):
+            tables.update(pyproject_tables(value, f"{prefix}{key}."))
+        else:
+            values[key] = value
+    if values:
+        tables[prefix.rstrip(".")] = values
+    return tables
+
+
+def setup_cfg_drift(root: Path, opts: ScaffoldOpts) -> Dict[str, List[str]]:
+    """Compare the managed setup.cfg sections.
+
+    :param root: repository root
+    :param opts: scaffold options of the repository
+    :returns: drifted keys per section
+    """
+    content = (root / "setup.cfg").read_text()
+    expected = setup_cfg_tables(expected_setup_cfg(content, opts))
+    return section_drift(setup_cfg_tables(content), expected)
+
+
+def pyproject_toml_drift(root: Path, opts: ScaffoldOpts) -> Dict[str, List[str]]:
+    """Compare the pyproject.toml tables managed by the extension.
+
+    :param root: repository root
+    :param opts: scaffold options of the repository
+    :returns: drifted keys per table
+    """
+    path = root / "pyproject.toml"
+    content = path.read_text() if path.is_file() else ""
+    managed = pyproject_tables(toml.loads(configure_pyproject_toml("", opts)))
+    expected = pyproject_tables(toml.loads(configure_pyproject_toml(content, opts)))
+    actual = pyproject_tables(toml.loads(content))
+    return section_drift(actual, {table: expected[table] for table in managed})
+
+
+def scan_repo(root: Path) -> Report:
+    """Scan one repository.
+
+    :param root: repository root
+    :returns: drift report of the repository
+    """
+    report: Report = {"repo": str(root)}
+    try:
+        opts = read_opts(root)
+        report["files"] = file_drift(root, opts)
+        report["setup.cfg"] = setup_cfg_drift(root, opts)
+        report["pyproject.toml"] = pyproject_toml_drift(root, opts)
+    except Exception as ex:  # noqa: B902
+        # one broken repository should not abort a scan over the whole fleet
+        report["error"] = f"{type(ex).__name__}: {ex}"
+    report["drifted"] = any(report.get(k) for k in REPORT_KEYS)
+    return report
+
+
+def rendered(struct: Structure, name: str, opts: ScaffoldOpts) -> str:
+    """Content of a file of a project structure, as a run would write it.
+
+    :param struct: project structure, see
+        :func:`~pyscaffoldext.jaustinpage.preflight.define_project`
+    :param name: file name, at the project root
+    :param opts: scaffold options
+    :returns: file content
+    """
+    content, _ = resolve_leaf(struct[name])
+    if isinstance(content, Deferred):
+        return content.render(opts)
+    return reify_content(content, opts) or ""
+
+
+def update_diff(root: Path) -> Report:
+    """Diff the setup.cfg and pyproject.toml of a repository against an update.
+
+    The files are rendered like ``putup --update --force`` would write them, with the
+    extensions and options of the repository, without writing anything.
+    :param root: repository root
+    :returns: diff report of the repository, see :func:`section_diff`
+    """
+    report: Report = {"repo": str(root)}
+    try:
+        project = {"project_path": root, "update": True, "force": True}
+        struct, opts = define_project(project)
+        setup_cfg = (root / "setup.cfg").read_text()
+        report["setup.cfg"] = section_diff(
+            setup_cfg_tables(setup_cfg, None),
+            setup_cfg_tables(rendered(struct, "setup.cfg", opts), None),
+        )
+        path = root / "pyproject.toml"
+        pyproject = path.read_text() if path.is_file() else ""
+        report["pyproject.toml"] = section_diff(
+            pyproject_tables(toml.loads(pyproject)),
+            pyproject_tables(toml.loads(rendered(struct, "pyproject.toml", opts))),
+        )
+    except Exception as ex:  # noqa: B902
+        # one broken repository should not abort a scan over the whole fleet
+        report["error"] = f"{type(ex).__name__}: {ex}"
+    report["drifted"] = any(report.get(k) for k in REPORT_KEYS)
+    return report
+
+
+def find_roots(patterns: Iterable[str]) -> List[Path]:
+    """Expand repository roots and glob patterns.
+
+    :param patterns: paths or glob patterns, ``~`` is expanded
+    :returns: sorted directories containing a setup.cfg
+    """
+    roots = {
+        Path(match)
+        for pattern in patterns
+        for match in glob.glob(str(Path(pattern).expanduser()))
+    }
+    return sorted(root for root in roots if (root / "setup.cfg").is_file())
+
+
+def scan(
+    roots: Iterable[Path],
+    workers: Optional[int] = None,
+    scanner: Callable[[Path], Report] = scan_repo,
+) -> List[Report]:
+    """Scan repositories in parallel.
+
+    :param roots: repository roots
+    :param workers: number of threads, see :class:`ThreadPoolExecutor`
+    :param scanner: scan of one repository, :func:`scan_repo` or :func:`update_diff`
+    :returns: one report per repository, in the order of ``roots``
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(scanner, roots))
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    """Parse command line parameters.
+
+    :param args: command line parameters as list of strings
+    :returns: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Report repositories that drifted from the jaustinpage templates"
+    )
+    parser.add_argument(
+        "roots", nargs="+", metavar="ROOT", help="repository root or glob pattern"
+    )
+    parser.add_argument("--workers", type=int, help="number of parallel scans")
+    parser.add_argument(
+        "--all", action="store_true", help="also report repositories without drift"
+    )
+    parser.add_argument(
+        "--update-diff",
+        action="store_true",
+        help="report the setup.cfg and pyproject.toml keys that putup --update "
+        "--force would change, per section",
+    )
+    return parser.parse_args(args)
+
+
+def main(args: List[str]) -> int:
+    """Scan repositories and print the JSON report to stdout.
+
+    :param args: command line parameters as list of strings
+    :returns: exit code, 1 if any repository drifted
+    """
+    parsed = parse_args(args)
+    scanner = update_diff if parsed.update_diff else scan_repo
+    reports = scan(find_roots(parsed.roots), parsed.workers, scanner)
+    drifted = [r for r in reports if r["drifted"]]
+    json.dump(reports if parsed.all else drifted, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if drifted else 0
+
+
+def run() -> None:
+    """Call :func:`main` with the CLI arguments extracted from :obj:`sys.argv`."""
+    sys.exit(main(sys.argv[1:]))  # pragma: no cover
+
+
+if __name__ == "__main__":
+    run()
@@ -1,20 +1,60 @@
 """Jaustinpage Austins Python Standard library pyscaffold extension."""
+import argparse
 from functools import reduce
-from typing import List
+from typing import Any, Callable, List, Optional, Sequence, Type, Union
 
 import toml
 from configupdater import ConfigUpdater
 from pyscaffold.actions import Action, ActionParams, ScaffoldOpts, Structure
-from pyscaffold.extensions import Extension
-from pyscaffold.operations import no_overwrite
-from pyscaffold.structure import merge, reify_leaf, reject
+from pyscaffold.extensions import Extension, include, store_with
+from pyscaffold.operations import create, no_overwrite
+from pyscaffold.structure import Leaf, merge, reify_content, reject, resolve_leaf
 
 from pyscaffoldext.jaustinpage import templates
-from pyscaffoldext.jaustinpage.templates import template
+from pyscaffoldext.jaustinpage.archive import ARCHIVE, write_archive
+from pyscaffoldext.jaustinpage.constraints import (
+    BUILD_REQUIREMENTS,
+    CONSTRAINTS,
+    build_requirements,
+    build_requirements_name,
+    constraints,
+    hash_checked,
+    installed_pythons,
+)
+from pyscaffoldext.jaustinpage.lockfile import recorded, write_lockfile
+from pyscaffoldext.jaustinpage.memory import (
+    MEMORY_BUDGET,
+    MEMORY_REPORT,
+    release_project,
+    report_memory,
+    start_tracing,
+    traced,
+)
+from pyscaffoldext.jaustinpage.metrics import (
+    METRICS_FILE,
+    count_project,
+    counted,
+    export_on_exit,
+    timed,
+)
+from pyscaffoldext.jaustinpage.preflight import check_templates
+from pyscaffoldext.jaustinpage.render import Deferred, deferred, resolve_deferred
+from pyscaffoldext.jaustinpage.store import CONTENT_STORE, HARDLINKS, stored
+from pyscaffoldext.jaustinpage.templates import compiled
 from pyscaffoldext.markdown.extension import Markdown
 
 JAUSTINPAGE_URL = "https://github.com/jaustinpage"
 
+TESTS_FLAKE8_IGNORE = "ABS101, ANN, DAR, D103, E501, S101"
+"""flake8 checks that do not apply to tests, see ``per-file-ignores`` in setup.cfg."""
+
+IMPORT_BUDGET_MS = 100
+"""Default budget for ``import <qual_pkg>`` in the generated import time test."""
+
+NAMESPACE_BUDGET_MS = 10
+"""Default budget for importing the namespace levels, with 1000 more ``sys.path``
+entries, in the test generated with ``--jaustinpage-fast-namespace``."""
+
 DEV_PACKAGES = ["tox"]
 
 DOCS_PACKAGES = ["recommonmark", "rinohtype", "sphinx>=3.2.1", "toml"]
@@ -26,6 +66,7 @@ TESTING_PACKAGES = [
     "pytest",
     "pytest-cov",
     "pytest-mock",
+    'tomli; python_version<"3.11"',
 ]
 
 FORMATTING_PACKAGES = [
@@ -71,12 +112,83 @@ LINTING_PACKAGES = [
     "flake8-return>=1.1.2",
     "flake8-simplify>=0.14.0",
     "flake8-spellcheck>=0.23.0",
-    "flake8-strftime>=0.3.1",
     "flake8-string-format>=0.2.3",
     "flake8-super",
     "flake8-use-pathlib",
     "pep8-naming",
+    "setuptools<82",
+]
+"""flake8 and its plugins. ``flake8-logging-format`` and ``flake8-use-pathlib`` import
+``pkg_resources``, which setuptools 82 removed."""
+
+PINNED_PACKAGES = [
+    *DEV_PACKAGES,
+    *DOCS_PACKAGES,
+    *TESTING_PACKAGES,
+    *FORMATTING_PACKAGES,
+    *LINTING_PACKAGES,
 ]
+"""Packages pinned in the generated ``constraints.txt``."""
+
+BUILD_PACKAGES = ["build", "setuptools>=46.1.0", "setuptools_scm[toml]>=5", "wheel"]
+"""Packages pinned in the generated build requirements: ``build`` and the
+``[build-system] requires`` of PyScaffold's ``pyproject.toml``, plus ``wheel``."""
+
+
+ADD_FILES = [
+    ".gitignore",
+    ".hgignore",
+    ".run/all.run.xml",
+    ".run/make.run.xml",
+    ".run/pytest debug.run.xml",
+    ".run/tox.run.xml",
+    "Makefile",
+    "noxfile.py",
+    "scripts/compare_wheels.py",
+    "scripts/coverage_changed.py",
+    "scripts/flake8_cached.py",
+    "scripts/pip_install.py",
+    "scripts/test_impact.py",
+    "tox.ini",
+    "whitelist.txt",
+]
+"""Files added by :func:`add_files`, rendered from ``templates/<name>.template``."""
+
+APIDOC_RMTREE = """try:
+    shutil.rmtree(output_dir)
+except FileNotFoundError:
+    pass
+"""
+APIDOC_MAIN = "    apidoc.main(args)\n"
+# ^  Parts of the sphinx-apidoc section of PyScaffold's docs/conf.py replaced by
+#    :func:`configure_docs_conf`.
+
+
+def flag_with(*extensions: Extension) -> Type[argparse.Action]:
+    """Create a boolean flag :obj:`argparse.Action` that also activates extensions.
+
+    Like :obj:`pyscaffold.extensions.store_with`, but for options without a value.
+    :param extensions: extension objects to be saved for activation
+    :returns: the action class
+    """
+
+    class StoreTrueWith(include(*extensions)):  # type: ignore
+        """Store ``True`` and append the given extensions to the extensions list."""
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, nargs=0, **kwargs)
+
+        def __call__(
+            self,
+            parser: argparse.ArgumentParser,
+            namespace: argparse.Namespace,
+            values: Union[str, Sequence[Any], None],
+            option_string: Optional[str] = None,
+        ) -> None:
+            super().__call__(parser, namespace, values, option_string)
+            setattr(namespace, self.dest, True)
+
+    return StoreTrueWith
 
 
 class Jaustinpage(Extension):
@@ -87,6 +199,86 @@ class Jaustinpage(Extension):
     extension - https://pyscaffold.org/en/latest/extensions.html
     """
 
+    def augment_cli(self, parser: argparse.ArgumentParser) -> "Jaustinpage":
+        """Augment the command-line interface parser.
+
+        See :obj:`pyscaffold.extension.Extension.augment_cli`.
+        :param parser: current parser object
+        :returns: the extension
+        """
+        super().augment_cli(parser)
+        parser.add_argument(
+            f"{self.flag}-lazy-init",
+            dest="jaustinpage_lazy_init",
+            action=flag_with(self),
+            default=argparse.SUPPRESS,
+            help="resolve __version__ and submodules of the generated package lazily, "
+            "on first access",
+        )
+        parser.add_argument(
+            f"{self.flag}-fast-namespace",
+            dest="jaustinpage_fast_namespace",
+            action=flag_with(self),
+            default=argparse.SUPPRESS,
+            help="with --namespace, make the namespace levels regular packages, "
+            "imported without scanning every sys.path entry",
+        )
+        parser.add_argument(
+            f"{self.flag}-memory-report",
+            dest=MEMORY_REPORT,
+            action=flag_with(self),
+            default=argparse.SUPPRESS,
+            help="report the peak and retained memory of each action, per project",
+        )
+        parser.add_argument(
+            f"{self.flag}-memory-budget",
+            dest=MEMORY_BUDGET,
+            action=store_with(self),
+            type=float,
+            default=argparse.SUPPRESS,
+            metavar="MIB",
+            help="warn about projects exceeding MIB of memory and release their "
+            "contents as soon as they are written, for large batch runs",
+        )
+        parser.add_argument(
+            f"{self.flag}-metrics",
+            dest=METRICS_FILE,
+            action=store_with(self),
+            default=argparse.SUPPRESS,
+            metavar="FILE",
+            help="export scaffolding metrics to FILE when the process exits, as JSON "
+            "if FILE ends with .json, in the Prometheus text format otherwise",
+        )
+        parser.add_argument(
+            f"{self.flag}-content-store",
+            dest=CONTENT_STORE,
+            action=store_with(self),
+            default=argparse.SUPPRESS,
+            metavar="DIR",
+            help="write the files that are the same in every project once to DIR, "
+            "and reflink them into the projects (or copy them, where the filesystem "
+            "has no reflinks), for large batch runs",
+        )
+        parser.add_argument(
+            f"{self.flag}-content-store-hardlinks",
+            dest=HARDLINKS,
+            action=flag_with(self),
+            default=argparse.SUPPRESS,
+            help="hardlink the files of the content store instead of copying them. "
+            "Not copy-on-write: an in-place edit of a hardlinked file made writable "
+            "changes it in every project",
+        )
+        parser.add_argument(
+            f"{self.flag}-archive",
+            dest=ARCHIVE,
+            action=store_with(self),
+            default=argparse.SUPPRESS,
+            metavar="FILE",
+            help="write the projects into the archive FILE instead of the filesystem, "
+            "as .zip, .tar, .tar.gz, .tar.bz2, .tar.xz or .tar.zst",
+        )
+        return self
+
     def activate(self, actions: List[Action]) -> List[Action]:
         """Activate extension.
 
@@ -99,10 +291,48 @@ class Jaustinpage(Extension):
         #    This way we can trust the activation order for registering actions,
         #    and the Python API is guaranteed to work, even if the user does not include
         #    Markdown in the list of extensions.
+        actions = self.register(actions, start_tracing, after="get_default_options")
+        actions = self.register(actions, export_on_exit, after="get_default_options")
         actions = self.register(actions, add_files)
-        return self.register(actions, replace_files, before="verify_project_dir")
+        actions = self.register(actions, count_project, after="create_structure")
+        actions = self.register(actions, write_lockfile, after="create_structure")
+        actions = self.register(actions, resolve_deferred, after="create_structure")
+        actions = self.register(actions, replace_files, before="verify_project_dir")
+        actions = self.register(actions, regular_namespace, before="create_structure")
+        actions = self.register(actions, check_templates, before="create_structure")
+        actions = self.register(actions, write_archive, before="create_structure")
+        actions = self.register(actions, report_memory, before="report_done")
+        actions = self.register(actions, release_project, after="report_done")
+        return [traced(action) for action in actions]
+
+
+def managed(name: str) -> Leaf:
+    """Leaf of a file rendered from a template, only if it is written.
+
+    :param name: template name
+    :returns: leaf recorded in the lockfile, that does not overwrite existing files,
+        linked from the content store if any
+    """
+    file_op = no_overwrite(deferred(recorded(stored(create, name), name)))
+    return Deferred(compiled(name), name), counted(file_op)
+
+
+def configured(leaf: Leaf, configure: Callable[[str, ScaffoldOpts], str]) -> Leaf:
+    """Customize the content of an existing leaf, only if it is written.
+
+    :param leaf: leaf defined by PyScaffold or by another extension
+    :param configure: customization, e.g. :func:`configure_setup_cfg`
+    :returns: leaf recorded in the lockfile, with the customized content
+    """
+    content, file_op = resolve_leaf(leaf)
+
+    def _render(opts: ScaffoldOpts) -> str:
+        return configure(reify_content(content, opts), opts)
 
+    return Deferred(_render), counted(deferred(recorded(file_op)))
 
+
+@timed
 def add_files(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
     """Add extension files.
 
@@ -111,31 +341,37 @@ def add_files(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
     :param struct: structure
     :returns: action params
     """
-    file_list = [
-        ".gitignore",
-        ".hgignore",
-        ".run/all.run.xml",
-        ".run/make.run.xml",
-        ".run/pytest debug.run.xml",
-        ".run/tox.run.xml",
-        "Makefile",
-        "tox.ini",
-        "whitelist.txt",
-    ]
-
     files: Structure = {}
 
-    for file_path in file_list:
+    for file_path in ADD_FILES:
         *dirs, file_name = file_path.split("/")
 
         files_descender = files
         for dir_ in dirs:
             files_descender = files_descender.setdefault(dir_, {})
-        files_descender[file_name] = (template(file_name.strip(".")), no_overwrite())
+        files_descender[file_name] = managed(file_name.strip("."))
+
+    files[CONSTRAINTS] = (
+        Deferred(lambda _: constraints(PINNED_PACKAGES)),
+        counted(no_overwrite(deferred(recorded(create)))),
+    )
+    build_files: Structure = {}
+    for python in installed_pythons():
+        if not hash_checked(BUILD_PACKAGES, python):
+            continue  # pip would install the requirements without checking them
+        build_files[build_requirements_name(python)] = (
+            Deferred(
+                lambda _, python=python: build_requirements(BUILD_PACKAGES, python)
+            ),
+            counted(no_overwrite(deferred(recorded(create)))),
+        )
+    if build_files:
+        files[BUILD_REQUIREMENTS] = build_files
 
     return merge(struct, files), opts
 
 
+@timed
 def configure_pyproject_toml(content: str, opts: ScaffoldOpts) -> str:
     """Set customizations to pyproject.toml.
 
@@ -145,6 +381,13 @@ def configure_pyproject_toml(content: str, opts: ScaffoldOpts) -> str:
     """
     pyproject_toml = toml.loads(content)
 
+    if opts.get("jaustinpage_lazy_init"):
+        package_path = opts["qual_pkg"].replace(".", "/")
+        setuptools_scm = pyproject_toml.setdefault("tool", {}).setdefault(
+            "setuptools_scm", {}
+        )
+        setuptools_scm["write_to"] = f"src/{package_path}/version.py"
+
     pyproject_toml["tool.black"] = {"line-length": 88}
 
     pyproject_toml["tool.isort"] = {"profile": "black"}
@@ -163,6 +406,14 @@ def configure_pyproject_toml(content: str, opts: ScaffoldOpts) -> str:
         ],
     }
 
+    pyproject_toml.setdefault("tool", {})["importtime"] = {
+        "budget_ms": IMPORT_BUDGET_MS,
+        "report_top": 10,
+    }
+    if fast_namespace(opts):
+        importtime = pyproject_toml["tool"]["importtime"]
+        importtime["namespace_budget_ms"] = NAMESPACE_BUDGET_MS
+
     pyproject_toml["tool.coverage.run"] = {"branch": True, "source": [opts["package"]]}
 
     pyproject_toml["tool.coverage.paths"] = {"source": ["src/", "*/site-packages/"]}
@@ -184,6 +435,7 @@ def configure_pyproject_toml(content: str, opts: ScaffoldOpts) -> str:
     return toml.dumps(pyproject_toml)
 
 
+@timed
 def configure_setup_cfg(content: str, opts: ScaffoldOpts) -> str:
     """Set customizations to setup.cfg.
 
@@ -205,6 +457,10 @@ def configure_setup_cfg(content: str, opts: ScaffoldOpts) -> str:
     updater["options.extras_require"]["dev"].set_values(DEV_PACKAGES)
     updater.set("options.extras_require", "docs")
     updater["options.extras_require"]["docs"].set_values(DOCS_PACKAGES)
+    updater.set("options.extras_require", "formatting")
+    updater["options.extras_require"]["formatting"].set_values(FORMATTING_PACKAGES)
+    updater.set("options.extras_require", "linting")
+    updater["options.extras_require"]["linting"].set_values(LINTING_PACKAGES)
 
     # flake8
     updater["flake8"]["extend_ignore"] = "E203, W503, ANN101"
@@ -212,6 +468,8 @@ def configure_setup_cfg(content: str, opts: ScaffoldOpts) -> str:
     updater["flake8"]["max-complexity"] = "8"
     updater["flake8"]["max-annotations-complexity"] = "4"
     updater["flake8"]["max-expression-complexity"] = "7"
+    updater["flake8"]["jobs"] = "auto"
+    updater["flake8"]["per-file-ignores"] = f"tests/*: {TESTS_FLAKE8_IGNORE}"
     if opts.get("namespace", False):
         ns_list = ",".join([f"{ns}.{opts['package']}" for ns in opts["ns_list"]])
         updater["flake8"]["known-modules"] = f"{opts['name']}:[{ns_list}]"
@@ -246,6 +504,54 @@ def configure_setup_cfg(content: str, opts: ScaffoldOpts) -> str:
     return str(updater)
 
 
+@timed
+def configure_coveragerc(content: str, opts: ScaffoldOpts) -> str:
+    """Set customizations to .coveragerc.
+
+    The tox, nox and make targets of the generated projects ask for the low-overhead
+    ``sys.monitoring`` core with ``COVERAGE_CORE=sysmon``. coverage.py falls back to its
+    default core where it cannot use it (before Python 3.12, and with branch coverage
+    before 3.14), without the ``no-sysmon`` warning. Older versions ignore it. An
+    existing ``disable_warnings`` is kept.
+
+    :param content: The content of the .coveragerc
+    :param opts: scaffold options
+    :returns: the modified content of the .coveragerc
+    """
+    updater = ConfigUpdater()
+    updater.read_string(content)
+    run = updater["run"]
+    if run.has_option("disable_warnings"):
+        return content
+    if run.has_option("branch"):
+        run["branch"].add_after.option("disable_warnings", "no-sysmon")
+    else:
+        run.set("disable_warnings", "no-sysmon")
+    return str(updater)
+
+
+@timed
+def configure_docs_conf(content: str, opts: ScaffoldOpts) -> str:
+    """Make the sphinx-apidoc run of docs/conf.py incremental.
+
+    PyScaffold's conf.py deletes the API pages and writes them all again before each
+    build, so every build reads them again. Instead, only the pages that changed are
+    written, see ``templates/conf_apidoc.py.template``. A conf.py without PyScaffold's
+    sphinx-apidoc section is left unchanged.
+
+    :param content: The content of the docs/conf.py
+    :param opts: scaffold options
+    :returns: the modified content of the docs/conf.py
+    """
+    if APIDOC_RMTREE not in content or APIDOC_MAIN not in content:
+        return content
+    run_apidoc_def = compiled("conf_apidoc.py").render(opts)
+    content = content.replace(APIDOC_RMTREE, f"\n\n{run_apidoc_def}")
+    run_apidoc = "    run_apidoc(apidoc.main, args, output_dir)\n"
+    return content.replace(APIDOC_MAIN, run_apidoc)
+
+
+@timed
 def replace_files(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
     """Replace existing files.
 
@@ -255,13 +561,13 @@ def replace_files(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
     :returns: action params
     """
     # do setup.cfg modifications
-    setup_content, setup_file_op = reify_leaf(struct["setup.cfg"], opts)
-    struct["setup.cfg"] = (configure_setup_cfg(setup_content, opts), setup_file_op)
-    pyproject_content, pyproject_file_op = reify_leaf(struct["pyproject.toml"], opts)
-    struct["pyproject.toml"] = (
-        configure_pyproject_toml(pyproject_content, opts),
-        pyproject_file_op,
+    struct["setup.cfg"] = configured(struct["setup.cfg"], configure_setup_cfg)
+    struct["pyproject.toml"] = configured(
+        struct["pyproject.toml"], configure_pyproject_toml
     )
+    struct[".coveragerc"] = configured(struct[".coveragerc"], configure_coveragerc)
+    docs = struct["docs"]
+    docs["conf.py"] = configured(docs["conf.py"], configure_docs_conf)
 
     # remove files for replacement
     replacement_files = [
@@ -276,23 +582,67 @@ def replace_files(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
 
     # define new files
     files: Structure = {
-        "AUTHORS.md": (template("AUTHORS.md"), no_overwrite()),
-        "LICENSE.txt": (template("LICENSE.txt"), no_overwrite()),
-        "README.md": (template("README.md"), no_overwrite()),
+        "AUTHORS.md": managed("AUTHORS.md"),
+        "LICENSE.txt": managed("LICENSE.txt"),
+        "README.md": managed("README.md"),
         "src": {
             opts["package"]: {
-                "__init__.py": templates.init,
-                "skeleton.py": (template("skeleton.py"), no_overwrite()),
+                "__init__.py": (
+                    Deferred(templates.init, templates.init_name(opts)),
+                    counted(deferred(recorded(create, templates.init_name(opts)))),
+                ),
+                "skeleton.py": managed("skeleton.py"),
+                "profiling.py": managed("profiling.py"),
             }
         },
         "tests": {
-            "test_skeleton.py": (template("test_skeleton.py"), no_overwrite()),
-            "conftest.py": (template("conftest.py"), no_overwrite()),
+            "test_skeleton.py": managed("test_skeleton.py"),
+            "test_profiling.py": managed("test_profiling.py"),
+            "test_import_time.py": managed("test_import_time.py"),
+            "bench_skeleton.py": managed("bench_skeleton.py"),
+            "bench_coverage.py": managed("bench_coverage.py"),
+            "conftest.py": managed("conftest.py"),
         },
         "docs": {
-            "index.md": (template("index.md"), no_overwrite()),
+            "index.md": managed("index.md"),
         },
     }
 
+    if opts.get("jaustinpage_lazy_init"):
+        files["tests"]["test_init.py"] = managed("test_init.py")
+    if fast_namespace(opts):
+        files["tests"]["test_namespace_import.py"] = managed("test_namespace_import.py")
+
     # merge new files and return
     return merge(struct, files), opts
+
+
+def fast_namespace(opts: ScaffoldOpts) -> bool:
+    """Whether the namespace levels are regular packages, see :func:`regular_namespace`.
+
+    :param opts: scaffold options
+    :returns: ``True`` with both ``--namespace`` and ``--jaustinpage-fast-namespace``
+    """
+    return bool(opts.get("jaustinpage_fast_namespace") and opts.get("namespace"))
+
+
+@timed
+def regular_namespace(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Make the namespace levels regular packages, for import speed.
+
+    PyScaffold removes their ``__init__.py`` to make them implicit namespace packages
+    (PEP 420), which every import in a new interpreter looks for in all the ``sys.path``
+    entries. A regular package is found in the first entry that has it. Without
+    ``--jaustinpage-fast-namespace``, the structure is left unchanged.
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: structure, with the namespace levels of ``opts["ns_list"]``
+    :param opts: scaffold options
+    :returns: action params
+    """
+    if not fast_namespace(opts):
+        return struct, opts
+    level = struct["src"]
+    for name in opts["ns_list"][-1].split("."):
+        level = level[name]
+        level["__init__.py"] = managed("__init__namespace.py")
+    return struct, opts
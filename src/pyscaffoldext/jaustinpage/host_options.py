@@ -0,0 +1,19 @@
+"""Opts keys that stay on the host running ``putup``.
+
+PyScaffold's ``add_pyscaffold`` writes every opts key that starts with the name of an
+extension, ``jaustinpage``, to the ``[pyscaffold]`` section of the generated
+``setup.cfg``, so that ``putup --update`` reuses it. Paths and budgets of the
+provisioning host and the state of a single run must not end up in the project, so
+their keys start with an underscore instead, see :func:`host_key`.
+"""
+
+HOST_PREFIX = "_jaustinpage_"
+
+
+def host_key(name: str) -> str:
+    """Opts key that PyScaffold does not persist in the generated ``setup.cfg``.
+
+    :param name: name of the option or state, e.g. ``"archive"``
+    :returns: the opts key, e.g. ``"_jaustinpage_archive"``
+    """
+    return f"{HOST_PREFIX}{name}"
@@ -0,0 +1,160 @@
+"""Scaffold lockfile of the files managed by the extension.
+
+Generated projects get a ``.jaustinpage.lock`` file that maps each managed path to the
+template it was rendered from, the hash of that template and the hash of the rendered
+content::
+
+    {
+    "generator": "pyscaffoldext-jaustinpage 1.2.3",
+    "files": {
+    "Makefile": ["Makefile", "<template sha256>", "<rendered sha256>"],
+    ...
+
+Files that are not rendered from a template (e.g. ``setup.cfg``) have a ``null``
+template name and hash. With the lockfile, update and drift tooling can tell pristine
+from user-modified files with one hash per file, without rendering anything.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pyscaffold.actions import ActionParams, ScaffoldOpts, Structure
+from pyscaffold.operations import FileContents, FileOp, create
+
+from pyscaffoldext.jaustinpage import __version__
+from pyscaffoldext.jaustinpage.host_options import host_key
+from pyscaffoldext.jaustinpage.templates import template
+
+LOCKFILE = ".jaustinpage.lock"
+
+LockEntries = Dict[str, List[Optional[str]]]
+
+_RECORDS = host_key("lock_records")
+# ^  Opts key for the files written during this run, see :mod:`.host_options`
+
+
+def sha256(content: str) -> str:
+    """Hash text content.
+
+    :param content: text
+    :returns: hex digest
+    """
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def template_hash(name: str) -> str:
+    """Hash the source of a template.
+
+    :param name: template name, as given to :func:`~.templates.template`
+    :returns: hex digest
+    """
+    return sha256(template(name).template)
+
+
+def lock_entry(template_name: Optional[str], content: str) -> List[Optional[str]]:
+    """Lock entry of a file.
+
+    :param template_name: template the file is rendered from, if any
+    :param content: content of the file
+    :returns: ``[template name, template hash, rendered hash]``
+    """
+    source = template_name and template_hash(template_name)
+    return [template_name, source, sha256(content)]
+
+
+def lockfile_content(entries: LockEntries) -> str:
+    """Content of a lockfile.
+
+    :param entries: lock entry per project relative path
+    :returns: JSON, with the entries sorted by path
+    """
+    lock = {
+        "generator": f"pyscaffoldext-jaustinpage {__version__}",
+        "files": dict(sorted(entries.items())),
+    }
+    return json.dumps(lock, indent=0) + "\n"
+
+
+def recorded(file_op: FileOp, template_name: Optional[str] = None) -> FileOp:
+    """File op modifier recording the files it writes for the lockfile.
+
+    :param file_op: the :obj:`FileOp` to decorate
+    :param template_name: template the file is rendered from, if any
+    :returns: the decorated file op
+    """
+
+    def _recorded(path: Path, contents: FileContents, opts: ScaffoldOpts):
+        written = file_op(path, contents, opts)
+        if written and contents is not None:
+            relative = Path(os.path.relpath(path, opts.get("project_path", ".")))
+            records = opts.setdefault(_RECORDS, {})
+            records[relative.as_posix()] = lock_entry(template_name, contents)
+        return written
+
+    return _recorded
+
+
+def read_lockfile(root: Path) -> LockEntries:
+    """Read the lock entries of a project.
+
+    :param root: project root
+    :returns: ``[template name, template hash, rendered hash]`` per path, empty
+        without lockfile
+    """
+    path = Path(root) / LOCKFILE
+    if not path.is_file():
+        return {}
+    return json.loads(path.read_text())["files"]
+
+
+def write_lockfile(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Write the lockfile, keeping the entries of files skipped in this run.
+
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: structure of the files written in this run
+    :param opts: scaffold options
+    :returns: action params
+    """
+    project_path = Path(opts.get("project_path", "."))
+    entries = {**read_lockfile(project_path), **opts.pop(_RECORDS, {})}
+    content = lockfile_content(entries)
+    create(project_path / LOCKFILE, content, opts)
+    return {**struct, LOCKFILE: content}, opts
+
+
+def file_status(root: Path) -> Dict[str, str]:
+    """Classify the locked files of a project, by hash only.
+
+    :param root: project root
+    :returns: per path, ``"pristine"`` if the file is as rendered, ``"modified"`` if
+        it was edited afterwards, ``"missing"`` if it was deleted. Pristine files
+        whose template changed since are ``"outdated"``.
+    """
+    status = {}
+    for path, (name, source, rendered) in read_lockfile(root).items():
+        file_path = Path(root) / path
+        if not file_path.is_file():
+            status[path] = "missing"
+        elif hashlib.sha256(file_path.read_bytes()).hexdigest() != rendered:
+            status[path] = "modified"
+        elif name and source != _current_template_hash(name):
+            status[path] = "outdated"
+        else:
+            status[path] = "pristine"
+    return status
+
+
+def _current_template_hash(name: str) -> Optional[str]:
+    """Hash of the current version of a template, if it still exists.
+
+    :param name: template name
+    :returns: hex digest or ``None``
+    """
+    try:
+        return template_hash(name)
+    except FileNotFoundError:
+        return None
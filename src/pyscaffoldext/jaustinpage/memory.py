@@ -0,0 +1,144 @@
+"""Memory report and memory budget mode for batch runs.
+
+With ``--jaustinpage-memory-report``, every action of the project is traced with
+:mod:`tracemalloc`, and the report lists, per action, the peak of memory allocated
+while it ran and the memory it retained afterwards. The project total is the peak over
+all actions, relative to the memory allocated before the project started.
+
+``--jaustinpage-memory-budget MIB`` also traces the actions, warns when a project
+exceeds the budget, and releases what a long batch run would otherwise accumulate: the
+rendered contents are not kept once written (see
+:func:`~pyscaffoldext.jaustinpage.render.deferred`) and the project structure is
+dropped when the project is done.
+
+Tracing slows the run down noticeably, so nothing is traced without these options.
+"""
+import tracemalloc
+from functools import wraps
+from typing import List, NamedTuple
+
+from pyscaffold.actions import Action, ActionParams, ScaffoldOpts, Structure
+from pyscaffold.log import logger
+
+from pyscaffoldext.jaustinpage.host_options import host_key
+
+MEMORY_REPORT = host_key("memory_report")
+MEMORY_BUDGET = host_key("memory_budget")
+# ^  Opts keys of the CLI options, see :mod:`.host_options`
+_USAGE = host_key("memory_usage")
+_STARTED = host_key("memory_started")
+
+MIB = 1024 * 1024
+
+
+class Usage(NamedTuple):
+    """Memory used by an action, in bytes, relative to the memory before it ran."""
+
+    action: str
+    peak: int
+    retained: int
+
+
+def traced(action: Action) -> Action:
+    """Wrap an action to record its :class:`Usage` while tracing.
+
+    :param action: action to trace, see :obj:`pyscaffold.actions.Action`
+    :returns: the wrapped action, with the same name
+    """
+
+    @wraps(action)
+    def _traced(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+        if _USAGE not in opts or not tracemalloc.is_tracing():
+            return action(struct, opts)
+        before = tracemalloc.get_traced_memory()[0]
+        _reset_peak()
+        struct, opts = action(struct, opts)
+        if _USAGE not in opts:
+            return struct, opts  # reported, see report_memory
+        current, peak = tracemalloc.get_traced_memory()
+        name = f"{action.__module__}:{action.__name__}"
+        usage = Usage(name, max(peak - before, 0), current - before)
+        opts.setdefault(_USAGE, []).append(usage)
+        return struct, opts
+
+    return _traced
+
+
+def _reset_peak() -> None:
+    """Reset the peak of traced memory, on Python 3.9+.
+
+    On older versions, peaks are the highest since tracing started.
+    """
+    reset_peak = getattr(tracemalloc, "reset_peak", None)
+    if reset_peak:  # pragma: no branch
+        reset_peak()
+
+
+def start_tracing(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Start tracing memory allocations, when a memory option is given.
+
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: structure
+    :param opts: scaffold options
+    :returns: action params
+    """
+    if opts.get(MEMORY_REPORT) or opts.get(MEMORY_BUDGET):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            opts[_STARTED] = True
+        opts[_USAGE] = []
+    return struct, opts
+
+
+def report_memory(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Report the memory used by each action of the project and check the budget.
+
+    Stops tracing memory allocations, unless they were traced before the project.
+
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: structure
+    :param opts: scaffold options
+    :returns: action params
+    """
+    usage: List[Usage] = opts.pop(_USAGE, None)
+    if usage is None:
+        return struct, opts
+    if opts.pop(_STARTED, False):
+        tracemalloc.stop()
+
+    lines = [f"{'peak MiB':>10} {'kept MiB':>10}  action"]
+    retained = 0
+    peak = 0
+    for action in usage:
+        peak = max(peak, retained + action.peak)
+        retained += action.retained
+        peak_mib, retained_mib = action.peak / MIB, action.retained / MIB
+        lines.append(f"{peak_mib:>10.2f} {retained_mib:>10.2f}  {action.action}")
+    lines.append(f"{peak / MIB:>10.2f} {retained / MIB:>10.2f}  total")
+    if opts.get(MEMORY_REPORT):
+        # warning level, so the requested report shows without --verbose
+        report = "\n  ".join(["", *lines])
+        logger.warning("memory of %s:%s", opts.get("project_path"), report)
+
+    budget = opts.get(MEMORY_BUDGET)
+    if budget and peak > float(budget) * MIB:
+        logger.warning(
+            "%s: memory peak of %.2f MiB exceeds the budget of %s MiB",
+            opts.get("project_path"),
+            peak / MIB,
+            budget,
+        )
+    return struct, opts
+
+
+def release_project(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Drop the structure of a finished project in memory budget mode.
+
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: structure of the files written
+    :param opts: scaffold options
+    :returns: action params, with an empty structure in memory budget mode
+    """
+    if opts.get(MEMORY_BUDGET):
+        return {}, opts
+    return struct, opts
@@ -0,0 +1,229 @@
+"""Process-wide metrics of the scaffolding runs.
+
+Counters and histograms are aggregated over every ``putup`` run of the process and
+exported when it exits, with ``--jaustinpage-metrics FILE``:
+
+- as a JSON snapshot when ``FILE`` ends with ``.json``,
+- in the Prometheus text format otherwise, e.g. ``jaustinpage.prom`` in the directory
+  of the node exporter textfile collector.
+
+The file is replaced atomically, so a scraper never reads a partial export.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Set, Tuple, TypeVar
+
+from pyscaffold.actions import ActionParams, ScaffoldOpts, Structure
+from pyscaffold.operations import FileContents, FileOp
+
+from pyscaffoldext.jaustinpage.host_options import host_key
+from pyscaffoldext.jaustinpage.templates import compiled
+
+PREFIX = "jaustinpage_"
+METRICS_FILE = host_key("metrics")
+# ^  Opts key of ``--jaustinpage-metrics``, see :mod:`.host_options`
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+"""Upper bounds of the latency histogram buckets, in seconds."""
+
+_LOCK = threading.Lock()
+_EXPORTS: Set[Path] = set()
+"""Files exported on exit, each registered once."""
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Counter:
+    """Monotonic counter.
+
+    :param name: metric name, without :data:`PREFIX`
+    :param description: help text
+    """
+
+    def __init__(self, name: str, description: str):
+        self.name = PREFIX + name
+        self.description = description
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        """Increment the counter.
+
+        :param amount: increment
+        """
+        with _LOCK:
+            self.value += amount
+
+
+class Histogram:
+    """Histogram with one series per label value, see :data:`BUCKETS`.
+
+    :param name: metric name, without :data:`PREFIX`
+    :param description: help text
+    :param label: name of the label of the series
+    """
+
+    def __init__(self, name: str, description: str, label: str):
+        self.name = PREFIX + name
+        self.description = description
+        self.label = label
+        self.series: Dict[str, Tuple[List[int], List[float]]] = {}
+        # ^  per label value: cumulative bucket counts and the ``[sum]`` of values
+
+    def observe(self, label_value: str, value: float) -> None:
+        """Record one value.
+
+        :param label_value: series of the value
+        :param value: observed value
+        """
+        with _LOCK:
+            counts, total = self.series.setdefault(
+                label_value, ([0] * (len(BUCKETS) + 1), [0.0])
+            )
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += 1
+            total[0] += value
+
+
+PROJECTS = Counter("projects_generated_total", "Projects generated.")
+FILES_WRITTEN = Counter("files_written_total", "Managed files written.")
+FILES_SKIPPED = Counter("files_skipped_total", "Managed files skipped.")
+BYTES_WRITTEN = Counter("bytes_written_total", "Bytes of managed files written.")
+ACTION_SECONDS = Histogram(
+    "action_duration_seconds", "Duration of the extension actions.", "action"
+)
+COUNTERS = [PROJECTS, FILES_WRITTEN, FILES_SKIPPED, BYTES_WRITTEN]
+
+
+def timed(func: F) -> F:
+    """Decorator recording the duration of each call in :data:`ACTION_SECONDS`.
+
+    :param func: function to time, its name is the label of the series
+    :returns: the decorated function
+    """
+
+    @wraps(func)
+    def _timed(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            ACTION_SECONDS.observe(func.__name__, time.perf_counter() - start)
+
+    return _timed  # type: ignore
+
+
+def counted(file_op: FileOp) -> FileOp:
+    """File op modifier counting the files written and skipped, and bytes written.
+
+    :param file_op: the :obj:`FileOp` to decorate
+    :returns: the decorated file op
+    """
+
+    def _counted(path: Path, contents: FileContents, opts: ScaffoldOpts):
+        written = file_op(path, contents, opts)
+        if not written:
+            FILES_SKIPPED.inc()
+        elif not opts.get("pretend"):
+            FILES_WRITTEN.inc()
+            BYTES_WRITTEN.inc(Path(written).stat().st_size)
+        return written
+
+    return _counted
+
+
+def count_project(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Count a generated project.
+
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: structure
+    :param opts: scaffold options
+    :returns: action params
+    """
+    if not opts.get("pretend"):
+        PROJECTS.inc()
+    return struct, opts
+
+
+def export_on_exit(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Export the metrics to the ``--jaustinpage-metrics`` file when the process exits.
+
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: structure
+    :param opts: scaffold options
+    :returns: action params
+    """
+    path = opts.get(METRICS_FILE)
+    if path and Path(path).resolve() not in _EXPORTS:
+        _EXPORTS.add(Path(path).resolve())
+        atexit.register(export, Path(path).resolve())
+    return struct, opts
+
+
+def snapshot() -> Dict[str, Any]:
+    """Current values of every metric.
+
+    :returns: JSON serializable snapshot
+    """
+    cache = compiled.cache_info()
+    with _LOCK:
+        values: Dict[str, Any] = {c.name: c.value for c in COUNTERS}
+        values[PREFIX + "template_cache_hits_total"] = cache.hits
+        values[PREFIX + "template_cache_misses_total"] = cache.misses
+        values[ACTION_SECONDS.name] = {
+            label: {
+                "buckets": dict(zip(map(str, BUCKETS), counts)),
+                "count": counts[-1],
+                "sum": total[0],
+            }
+            for label, (counts, total) in sorted(ACTION_SECONDS.series.items())
+        }
+    return values
+
+
+def prometheus_text(values: Dict[str, Any]) -> str:
+    """Format a snapshot in the Prometheus text exposition format.
+
+    :param values: see :func:`snapshot`
+    :returns: text export
+    """
+    descriptions = {c.name: c.description for c in COUNTERS}
+    descriptions[PREFIX + "template_cache_hits_total"] = "Template cache hits."
+    descriptions[PREFIX + "template_cache_misses_total"] = "Template cache misses."
+    lines = []
+    for name, description in descriptions.items():
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+        lines.append(f"{name} {values[name]}")
+    histogram = ACTION_SECONDS
+    lines.append(f"# HELP {histogram.name} {histogram.description}")
+    lines.append(f"# TYPE {histogram.name} histogram")
+    for label, series in values[histogram.name].items():
+        selector = f'{histogram.label}="{label}"'
+        buckets = [*series["buckets"].items(), ("+Inf", series["count"])]
+        for bound, count in buckets:
+            lines.append(f'{histogram.name}_bucket{{{selector},le="{bound}"}} {count}')
+        lines.append(f"{histogram.name}_sum{{{selector}}} {series['sum']}")
+        lines.append(f"{histogram.name}_count{{{selector}}} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path: Path) -> None:
+    """Write the metrics to ``path``, replacing it atomically.
+
+    :param path: JSON snapshot if it ends with ``.json``, Prometheus text otherwise
+    """
+    values = snapshot()
+    if path.suffix == ".json":
+        content = json.dumps(values, indent=2) + "\n"
+    else:
+        content = prometheus_text(values)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.{os.getpid()}")
+    partial.write_text(content)
+    os.replace(partial, path)
@@ -0,0 +1,184 @@
+"""Check projects before writing anything, so a failing run leaves no partial tree.
+
+The templates are only rendered when their file is written, so a template placeholder
+without a value used to show up mid-generation, after other files were written. The
+:func:`check_templates` action checks the placeholders of every template of the
+project structure against the scaffold options right before ``create_structure``.
+
+Batch runs check all their projects at once, before generating the first one::
+
+    projects = [{"project_path": name, "extensions": [Jaustinpage()]} for name in names]
+    preflight(projects)
+    for opts in projects:
+        api.create_project(opts)
+
+:func:`preflight` raises a :class:`PreflightError` listing the missing placeholders of
+every project, and the targets that ``putup`` would refuse: existing directories
+without ``update`` or ``force``, missing projects with ``update``, projects nested in a
+git repository without ``force`` and paths given twice. The templates of files that an
+update keeps (see :func:`pyscaffold.operations.no_overwrite`) are checked too: a
+template missing a key fails in the projects that do not have the file yet.
+"""
+from functools import lru_cache
+from itertools import takewhile
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+from pyscaffold import actions, api, repo
+from pyscaffold.actions import ActionParams, ScaffoldOpts, Structure
+from pyscaffold.exceptions import DirectErrorForUser
+from pyscaffold.structure import resolve_leaf
+
+from pyscaffoldext.jaustinpage import templates
+from pyscaffoldext.jaustinpage.render import Deferred
+from pyscaffoldext.jaustinpage.templates import compiled
+
+LITERAL_PLACEHOLDERS = frozenset({"PROJECT_DIR", "py"})
+"""Placeholders left as they are: ``$PROJECT_DIR$`` of the PyCharm run configurations
+and ``*$py.class`` of the ignore files."""
+
+RENDER_KEYS = frozenset({"distribution"})
+"""Options set while rendering, by :func:`~pyscaffoldext.jaustinpage.templates.init`."""
+
+SKIPPED_ACTIONS = {"pyscaffold.actions:verify_project_dir"}
+"""Actions that :func:`preflight` replaces by its own checks, for the whole batch."""
+
+WRITE_ACTIONS = {
+    "pyscaffoldext.jaustinpage.preflight:check_templates",
+    "pyscaffold.structure:create_structure",
+}
+"""Actions that :func:`preflight` stops at: the first ones that may write, without the
+extension."""
+
+
+class PreflightError(DirectErrorForUser):
+    """Projects cannot be generated.
+
+    :param problems: one message per problem
+    """
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        super().__init__("\n  ".join(["preflight check failed:", *problems]))
+
+
+@lru_cache(maxsize=None)
+def placeholder_index() -> Dict[str, FrozenSet[str]]:
+    """Placeholders of every template of the extension, indexed once.
+
+    :returns: placeholders per template name
+    """
+    directory = Path(templates.__file__).parent
+    names = sorted(path.stem for path in directory.glob("*.template"))
+    return {name: compiled(name).placeholders for name in names}
+
+
+def missing_keys(struct: Structure, opts: ScaffoldOpts, prefix: str = "") -> List[str]:
+    """Placeholders without a value, in the templates of a project structure.
+
+    :param struct: project structure
+    :param opts: scaffold options
+    :param prefix: directory of ``struct`` in the project, with a trailing ``/``
+    :returns: one message per file, for the files rendered from a template
+    """
+    index = placeholder_index()
+    known = LITERAL_PLACEHOLDERS.union(RENDER_KEYS, opts)
+    problems = []
+    for name, node in struct.items():
+        path = f"{prefix}{name}"
+        if isinstance(node, dict):
+            problems.extend(missing_keys(node, opts, f"{path}/"))
+            continue
+        content, _ = resolve_leaf(node)
+        if isinstance(content, Deferred) and content.template_name:
+            missing = sorted(index[content.template_name] - known)
+            if missing:
+                name = content.template_name
+                problems.append(f"{path}: {name} misses {', '.join(missing)}")
+    return problems
+
+
+def reads_only(action: actions.Action) -> bool:
+    """Whether an action comes before the :data:`WRITE_ACTIONS`.
+
+    :param action: action of the pipeline
+    :returns: ``True`` if :func:`preflight` runs the action
+    """
+    return actions.get_id(action) not in WRITE_ACTIONS
+
+
+def check_templates(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Check the placeholders of the templates, before ``create_structure``.
+
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: project structure
+    :param opts: scaffold options
+    :returns: action params
+    :raises PreflightError: with the placeholders without a value
+    """
+    problems = missing_keys(struct, opts)
+    if problems:
+        project = opts.get("project_path", ".")
+        raise PreflightError([f"{project}/{problem}" for problem in problems])
+    return struct, opts
+
+
+def target_problems(opts: ScaffoldOpts) -> List[str]:
+    """Problems of the target directory, the checks of ``verify_project_dir``.
+
+    :param opts: scaffold options
+    :returns: one message per problem
+    """
+    project = Path(opts["project_path"])
+    parent = project.resolve().parent
+    if project.exists():
+        if not opts["update"] and not opts["force"]:
+            return [f"{project} already exists, use update or force"]
+    elif opts["update"]:
+        return [f"{project} does not exist and thus cannot be updated"]
+    elif repo.is_git_repo(parent) and not opts["force"]:
+        return [f"{project} would be nested in the git repository {parent}, use force"]
+    return []
+
+
+def define_project(project: ScaffoldOpts) -> ActionParams:
+    """Define the structure of a project, as a run would write it, without writing.
+
+    Runs the actions of the pipeline that only read the filesystem, up to
+    :func:`check_templates`, except the :data:`SKIPPED_ACTIONS`.
+
+    :param project: options, as given to :func:`pyscaffold.api.create_project`
+    :returns: the structure and the complete options
+    """
+    struct, opts = {}, api.bootstrap_options(project)
+    for action in takewhile(reads_only, actions.discover(opts["extensions"])):
+        if actions.get_id(action) not in SKIPPED_ACTIONS:
+            struct, opts = action(struct, opts)
+    return struct, opts
+
+
+def preflight(projects: Iterable[ScaffoldOpts]) -> None:
+    """Check a batch of projects, before writing anything.
+
+    See :func:`define_project`.
+
+    :param projects: options of each project, as given to
+        :func:`pyscaffold.api.create_project`, with their ``extensions``
+    :raises PreflightError: with the problems of every project
+    """
+    problems: List[str] = []
+    paths: Set[Path] = set()
+    for project in projects:
+        try:
+            struct, opts = define_project(project)
+        except DirectErrorForUser as ex:
+            problems.append(f"{project.get('project_path', '.')}: {ex}")
+            continue
+        project_path = opts["project_path"]
+        if Path(project_path).resolve() in paths:
+            problems.append(f"{project_path} appears twice in the batch")
+        paths.add(Path(project_path).resolve())
+        problems.extend(target_problems(opts))
+        problems.extend(f"{project_path}/{p}" for p in missing_keys(struct, opts))
+    if problems:
+        raise PreflightError(problems)
@@ -0,0 +1,239 @@
+"""Render templates compiled once into literal segments and placeholder slots.
+
+:meth:`string.Template.substitute` scans the whole template body with a regex on every
+call. A :class:`CompiledTemplate` scans it once: rendering only fills the slots of a
+list of segments and joins it, e.g.::
+
+    readme = CompiledTemplate(template("README.md"))
+    readme.validate(opts)  # KeyError before anything is rendered
+    contents = readme.render_many(opts_per_project)
+
+Compiled templates are callables of ``opts``, so they can be used as the content of a
+leaf of a PyScaffold :obj:`~pyscaffold.structure.Structure`, like ``Template`` objects.
+PyScaffold renders such contents before the file op decides whether to write the file.
+:class:`Deferred` contents are rendered by the :func:`deferred` file op instead, only
+for the files that are actually written, and not at all with ``--pretend``.
+"""
+from pathlib import Path
+from string import Template
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from pyscaffold.actions import ActionParams, ScaffoldOpts, Structure
+from pyscaffold.operations import FileContents, FileOp
+
+from pyscaffoldext.jaustinpage.memory import MEMORY_BUDGET
+
+
+class CompiledTemplate:
+    """A template split into literal segments and placeholder slots.
+
+    :param source: template to compile
+    :param keys: when given, placeholders that are not in ``keys`` raise
+        :obj:`KeyError` at compile time
+    """
+
+    def __init__(self, source: Template, keys: Optional[Iterable[str]] = None):
+        self.source = source
+        self.segments, self.slots, self.invalid = _split(source)
+        self.placeholders = frozenset(name for _, name in self.slots)
+        if keys is not None:
+            self.validate(keys)
+
+    def __deepcopy__(self, memo: Dict[int, object]) -> "CompiledTemplate":
+        """Share the template: it does not change once compiled.
+
+        PyScaffold deep copies the project structure, with its leaves, each time it
+        merges or rejects files.
+        :param memo: objects already copied
+        :returns: the template itself
+        """
+        return self
+
+    def __call__(self, opts: Mapping[str, object]) -> str:
+        """Render like :meth:`string.Template.safe_substitute`.
+
+        :param opts: mapping parameters dictionary
+        :returns: rendered content
+        """
+        return self.render(opts, safe=True)
+
+    def missing(self, keys: Iterable[str]) -> List[str]:
+        """Placeholders without a value.
+
+        :param keys: available keys, e.g. scaffold options
+        :returns: sorted names of the missing placeholders
+        """
+        return sorted(self.placeholders.difference(keys))
+
+    def validate(self, keys: Iterable[str]) -> None:
+        """Check that every placeholder has a value.
+
+        :param keys: available keys, e.g. scaffold options
+        :raises KeyError: listing the missing placeholders
+        """
+        missing = self.missing(keys)
+        if missing:
+            raise KeyError(", ".join(missing))
+
+    def render(self, opts: Mapping[str, object], safe: bool = False) -> str:
+        """Fill the slots with ``opts``.
+
+        :param opts: mapping parameters dictionary
+        :param safe: leave placeholders without value as they are instead of raising
+            :obj:`KeyError`, like :meth:`string.Template.safe_substitute`
+        :returns: rendered content
+        :raises ValueError: for invalid placeholders, unless ``safe``
+        """
+        if self.invalid and not safe:
+            raise ValueError(self.invalid)
+        parts = self.segments.copy()
+        for index, name in self.slots:
+            if name in opts:
+                parts[index] = str(opts[name])
+            elif not safe:
+                raise KeyError(name)
+        return "".join(parts)
+
+    def render_many(self, many_opts: Iterable[Mapping[str, object]]) -> List[str]:
+        """Render the template once per mapping, validating them first.
+
+        :param many_opts: mapping parameters dictionaries
+        :returns: rendered contents, in the order of ``many_opts``
+        :raises KeyError: listing the placeholders missing in the first incomplete
+            mapping, before anything is rendered
+        :raises ValueError: for invalid placeholders
+        """
+        many_opts = list(many_opts)
+        for opts in many_opts:
+            if not self.placeholders.issubset(opts):
+                self.validate(opts)
+        if self.invalid:
+            raise ValueError(self.invalid)
+        segments, slots = self.segments, self.slots
+        rendered = []
+        for opts in many_opts:
+            parts = segments.copy()
+            for index, name in slots:
+                parts[index] = str(opts[name])
+            rendered.append("".join(parts))
+        return rendered
+
+
+class Deferred:
+    """Leaf content rendered by the :func:`deferred` file op, when the file is written.
+
+    PyScaffold passes contents that are neither callable nor templates unchanged to
+    the file op of the leaf, and then keeps them in the structure of the files that
+    changed, see :func:`resolve_deferred`.
+    :param render: renders the content from the scaffold options
+    :param template_name: template the content is rendered from, if any, for the
+        lockfile of :mod:`~pyscaffoldext.jaustinpage.archive`
+    """
+
+    def __init__(
+        self,
+        render: Callable[[ScaffoldOpts], str],
+        template_name: Optional[str] = None,
+    ):
+        self.render = render
+        self.template_name = template_name
+        self.content: Optional[str] = None
+
+    def __repr__(self) -> str:
+        """Representation, e.g. in ``--pretend`` logs.
+
+        :returns: representation
+        """
+        return f"{type(self).__name__}({self.render!r})"
+
+
+def deferred(file_op: FileOp) -> FileOp:
+    """File op modifier rendering :class:`Deferred` contents before calling ``file_op``.
+
+    Put it behind the file op modifiers that can skip the file, e.g.
+    ``no_overwrite(deferred(create))``. With ``--pretend`` nothing is written, so
+    nothing is rendered either. In memory budget mode, the rendered content is not
+    kept for :func:`resolve_deferred`.
+    :param file_op: the :obj:`FileOp` to decorate
+    :returns: the decorated file op
+    """
+
+    def _deferred(path: Path, contents: FileContents, opts: ScaffoldOpts):
+        if isinstance(contents, Deferred):
+            rendered = "" if opts.get("pretend") else contents.render(opts)
+            if not opts.get(MEMORY_BUDGET):
+                contents.content = rendered or None
+            contents = rendered
+        return file_op(path, contents, opts)
+
+    return _deferred
+
+
+def resolve_deferred(struct: Structure, opts: ScaffoldOpts) -> ActionParams:
+    """Replace :class:`Deferred` contents by the content that was written.
+
+    Run it right after ``create_structure``: the actions that follow, like
+    ``init_git``, expect the changed files to have string (or ``None``) contents.
+    See :obj:`pyscaffold.actions.Action`
+    :param struct: structure of the files written by ``create_structure``
+    :param opts: scaffold options
+    :returns: action params
+    """
+    resolved: Structure = {}
+    for name, node in struct.items():
+        if isinstance(node, dict):
+            resolved[name], _ = resolve_deferred(node, opts)
+        elif isinstance(node, Deferred):
+            resolved[name] = node.content
+        else:
+            resolved[name] = node
+    return resolved, opts
+
+
+Slot = Tuple[int, str]
+
+
+def _split(source: Template) -> Tuple[List[str], List[Slot], Optional[str]]:
+    """Split a template, with the same placeholder syntax as its ``substitute``.
+
+    Invalid placeholders are kept as literal text, like ``safe_substitute`` does.
+    :param source: template to split
+    :returns: the segments, with the original placeholder text in each slot, the
+        ``(segment index, placeholder name)`` of each slot and the error message
+        ``substitute`` gives for the first invalid placeholder, if any
+    """
+    text = source.template
+    segments: List[str] = []
+    slots: List[Slot] = []
+    literal: List[str] = []
+    invalid = None
+    position = 0
+    for match in source.pattern.finditer(text):
+        literal.append(text[position : match.start()])
+        position = match.end()
+        name = match.group("named") or match.group("braced")
+        if name is not None:
+            segments.append("".join(literal))
+            literal = []
+            slots.append((len(segments), name))
+            segments.append(match.group())
+        elif match.group("escaped") is not None:
+            literal.append(source.delimiter)
+        else:
+            literal.append(match.group())
+            invalid = invalid or _invalid_message(text, match.start("invalid"))
+    literal.append(text[position:])
+    segments.append("".join(literal))
+    return segments, slots, invalid
+
+
+def _invalid_message(text: str, index: int) -> str:
+    """Error message of :meth:`string.Template.substitute` for an invalid placeholder.
+
+    :param text: template text
+    :param index: position of the invalid placeholder
+    :returns: message, with 1-based line and column
+    """
+    lines = text[:index].splitlines(keepends=True)  # never empty, ends with "$"
+    column = index - len("".join(lines[:-1]))
+    return f"Invalid placeholder in string: line {len(lines)}, col {column}"
@@ -0,0 +1,142 @@
+"""Content store: write the files shared by every project once, and link them.
+
+Files rendered from templates without any scaffold option (``.gitignore``,
+``Makefile``, ``tox.ini``, ...) are byte-identical across the generated projects. With
+``--jaustinpage-content-store DIR``, each of them is written once to ``DIR``, named by
+the sha256 of its content, and linked into every project:
+
+- reflinked where the filesystem supports it (Btrfs, XFS, ...): the projects share the
+  blocks copy-on-write, and each file stays an independent, writable file,
+- copied otherwise, or when the store is on another filesystem than the project.
+
+``--jaustinpage-content-store-hardlinks`` hardlinks the files instead of copying them.
+The projects then share one read-only inode per file, which is not copy-on-write:
+once made writable, e.g. by ``chmod u+w``, an edit in place (appending with ``>>``,
+editors that do not replace the file when saving) changes the file in every project,
+and in the store. Files written again by the extension, e.g. with ``--force``, are
+unlinked first, so a rewrite never goes through a hardlink.
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+
+from pyscaffold.actions import ScaffoldOpts
+from pyscaffold.log import logger
+from pyscaffold.operations import FileContents, FileOp
+
+from pyscaffoldext.jaustinpage.host_options import host_key
+from pyscaffoldext.jaustinpage.lockfile import sha256
+from pyscaffoldext.jaustinpage.templates import compiled
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore  # Windows, hardlinks only
+
+CONTENT_STORE = host_key("content_store")
+# ^  Opts key of ``--jaustinpage-content-store``, see :mod:`.host_options`
+HARDLINKS = host_key("content_store_hardlinks")
+
+FICLONE = 0x40049409
+"""``ioctl`` request cloning a whole file, see ``ioctl_ficlone(2)``."""
+
+BLOB_MODE = 0o444
+"""Mode of the blobs, and of the files hardlinked to them, see :data:`HARDLINKS`."""
+
+
+def blob(store: Path, content: str) -> Path:
+    """Write content to the store, once.
+
+    :param store: store directory
+    :param content: file content
+    :returns: path of the read-only blob, ``<store>/<sha256[:2]>/<sha256>``
+    """
+    digest = sha256(content)
+    path = store / digest[:2] / digest
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=".")
+        with os.fdopen(descriptor, "wb") as blob_file:
+            blob_file.write(content.encode())
+        os.chmod(temporary, BLOB_MODE)
+        os.replace(temporary, path)  # concurrent runs write the same content
+    return path
+
+
+def _clone(source: BinaryIO, target: BinaryIO) -> None:
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+
+
+def _reflink(source: Path, path: Path) -> bool:
+    with open(source, "rb") as source_file, open(path, "xb") as target_file:
+        try:
+            _clone(source_file, target_file)
+            return True
+        except OSError:
+            pass
+    path.unlink()
+    return False
+
+
+def link(source: Path, path: Path, hardlinks: bool = False) -> str:
+    """Link a blob into a project, with the cheapest method the filesystem supports.
+
+    :param source: blob, see :func:`blob`
+    :param path: new file, that must not exist
+    :param hardlinks: hardlink the blob where it cannot be reflinked, instead of
+        copying it. The file then shares the blob's inode with every project
+    :returns: ``"reflink"``, ``"hardlink"`` or ``"copy"``
+    """
+    if _reflink(source, path):
+        return "reflink"
+    if hardlinks:
+        try:
+            os.link(source, path)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copyfile(source, path)
+    return "copy"
+
+
+def shared(template_name: str, opts: ScaffoldOpts) -> bool:
+    """Whether a template renders the same content for every project.
+
+    :param template_name: template name
+    :param opts: scaffold options
+    :returns: ``True`` if none of the placeholders of the template is an option
+    """
+    return compiled(template_name).placeholders.isdisjoint(opts)
+
+
+def stored(file_op: FileOp, template_name: str) -> FileOp:
+    """File op modifier linking shared files from the ``--jaustinpage-content-store``.
+
+    Without the option, or for the templates using scaffold options, ``file_op``
+    writes the file.
+
+    :param file_op: the :obj:`FileOp` to decorate
+    :param template_name: template the file is rendered from
+    :returns: the decorated file op
+    """
+
+    def _stored(path: Path, contents: FileContents, opts: ScaffoldOpts):
+        if contents is None or opts.get("pretend"):
+            return file_op(path, contents, opts)
+        store = opts.get(CONTENT_STORE)
+        if store and shared(template_name, opts):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                path.unlink()
+            method = link(blob(Path(store), contents), path, opts.get(HARDLINKS, False))
+            logger.report(method, path)
+            return path
+        if path.is_file() and path.stat().st_nlink > 1:
+            path.unlink()  # never write through a hardlink
+        return file_op(path, contents, opts)
+
+    return _stored
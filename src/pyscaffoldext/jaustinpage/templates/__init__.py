@@ -1,15 +1,30 @@
 """Templates for PyScaffold's Jaustinpage extension."""
 
-from functools import partial
+from functools import lru_cache, partial
 
 from pyscaffold.templates import ScaffoldOpts, get_template
 
+from pyscaffoldext.jaustinpage.render import CompiledTemplate
+
 template = partial(get_template, relative_to=__name__)
 
 
+@lru_cache(maxsize=None)
+def compiled(name: str) -> CompiledTemplate:
+    """Template compiled once, see :mod:`~pyscaffoldext.jaustinpage.render`.
+
+    :param name: template name, as given to :func:`template`
+    :returns: the compiled template
+    """
+    return CompiledTemplate(template(name))
+
+
 def init(opts: ScaffoldOpts) -> str:
     """Template __init__.py.
 
+    With ``jaustinpage_lazy_init`` set, ``__version__`` and the submodules are resolved
+    lazily on first access.
+
     :param opts: mapping parameters dictionary
     :returns: file content as string
     """
@@ -17,5 +32,15 @@ def init(opts: ScaffoldOpts) -> str:
         opts["distribution"] = "__name__"
     else:
         opts["distribution"] = '"{0}"'.format(opts["name"])
-    template_src = template("__init__.py")
-    return template_src.substitute(opts)
+    return compiled(init_name(opts)).render(opts)
+
+
+def init_name(opts: ScaffoldOpts) -> str:
+    """Name of the template used for __init__.py.
+
+    :param opts: mapping parameters dictionary
+    :returns: template name
+    """
+    if opts.get("jaustinpage_lazy_init"):
+        return "__init__lazy.py"
+    return "__init__.py"
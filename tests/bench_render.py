@@ -0,0 +1,61 @@
+"""Benchmark compiled templates against ``string.Template``, and batch rendering.
+
+Run with ``python tests/bench_render.py``, it is not collected by pytest.
+"""
+import timeit
+
+from pyscaffoldext.jaustinpage.batch import columns_from_rows, render_files
+from pyscaffoldext.jaustinpage.extension import ADD_FILES
+from pyscaffoldext.jaustinpage.render import CompiledTemplate
+from pyscaffoldext.jaustinpage.templates import template
+
+TEMPLATES = ["README.md", "noxfile.py"]
+BATCH = 1_000
+REPEAT = 5
+
+
+def best_of(statement, number):
+    """Best wall time of ``REPEAT`` runs of ``statement``, in microseconds per call."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEAT)) / number * 1e6
+
+
+def main():
+    """Print a comparison table."""
+    header = ("template", "substitute", "compile", "render", "batch/opts")
+    print("{0:>12} {1:>12} {2:>12} {3:>12} {4:>12}".format(*header))  # noqa: T001
+    print("{0:>12} {1:>12} {1:>12} {1:>12} {1:>12}".format("", "us"))  # noqa: T001
+    for name in TEMPLATES:
+        source = template(name)
+        compiled = CompiledTemplate(source)
+        opts = {key: f"value_of_{key}" for key in compiled.placeholders}
+        many_opts = [{**opts, "name": f"project_{i}"} for i in range(BATCH)]
+        substitute_us = best_of(lambda: source.substitute(opts), BATCH)  # noqa: B023
+        compile_us = best_of(lambda: CompiledTemplate(source), 100)  # noqa: B023
+        render_us = best_of(lambda: compiled.render(opts), BATCH)  # noqa: B023
+        batch_us = best_of(lambda: compiled.render_many(many_opts), 1) / BATCH  # noqa
+        print(  # noqa: T001
+            f"{name:>12} {substitute_us:>12.2f} {compile_us:>12.2f}"
+            f" {render_us:>12.2f} {batch_us:>12.2f}"
+        )
+
+    rows = [
+        {"name": f"project_{i}", "qual_pkg": f"my.ns.project_{i}", "py": "py"}
+        for i in range(BATCH)
+    ]
+    names = [path.split("/")[-1].strip(".") for path in ADD_FILES]
+    templates = [CompiledTemplate(template(name)) for name in names]
+    columns = columns_from_rows(rows)
+    per_project_us = best_of(
+        lambda: [t(row) for row in rows for t in templates], 1  # noqa: B023
+    )
+    columns_us = best_of(lambda: render_files(columns), 1)
+    shared = {id(c) for contents in render_files(columns).values() for c in contents}
+    print(f"\n{len(ADD_FILES)} added files of {BATCH} projects")  # noqa: T001
+    print("{0:>12} {1:>12} {2:>12}".format("", "ms", "strings"))  # noqa: T001
+    strings = len(ADD_FILES) * BATCH
+    print(f"{'per project':>12} {per_project_us / 1000:>12.2f} {strings:>12}")  # noqa
+    print(f"{'columns':>12} {columns_us / 1000:>12.2f} {len(shared):>12}")  # noqa: T001
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,45 @@ A nice option is to put your ``autouse`` fixtures here.
 Functions that can be imported and re-used are more suitable for the ``helpers`` file.
 """
 import os
+import sys
 from pathlib import Path
 from tempfile import mkdtemp
 
 import pytest
 
+from pyscaffoldext.jaustinpage import constraints
+
 from .helpers import rmpath
 
+FAKE_PINS = [
+    constraints.Pin("flake8", "1.0.0", "a" * 64),
+    constraints.Pin("pytest", "2.0.0", ""),
+]
+
+FAKE_INTERPRETERS = {"3.8": "/usr/bin/python3.8", constraints.PYTHON: sys.executable}
+
+
+@pytest.fixture(autouse=True)
+def resolutions(request, tmp_path, monkeypatch):
+    """Resolve requirements without pip and cache them in a temporary directory.
+
+    Python 3.8 and the running Python are the installed interpreters. Tests marked
+    ``real_resolution`` resolve with pip instead, e.g. to install the pinned versions.
+    """
+    resolved = []
+
+    def _resolve(requirements, executable):
+        resolved.append((requirements, executable))
+        return FAKE_PINS
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    if not request.node.get_closest_marker("real_resolution"):
+        monkeypatch.setattr(constraints, "interpreter", FAKE_INTERPRETERS.get)
+        monkeypatch.setattr(constraints, "resolve", _resolve)
+    constraints._cached_pins.cache_clear()
+    yield resolved
+    constraints._cached_pins.cache_clear()
+
 
 @pytest.fixture()
 def tmpfolder(tmp_path):
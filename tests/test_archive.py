@@ -0,0 +1,115 @@
+"""Test the archive output mode."""
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+from string import Template
+
+import pytest
+from pyscaffold import api, cli
+
+from pyscaffoldext.jaustinpage import archive
+from pyscaffoldext.jaustinpage.extension import Jaustinpage
+from pyscaffoldext.jaustinpage.lockfile import LOCKFILE
+
+
+@pytest.fixture(autouse=True)
+def closed():
+    yield
+    archive.close_archives()
+
+
+def generate(name, *extra_args):
+    cli.main([name, "--no-config", *extra_args])
+    # --no-config: avoid extra config from dev's machine interference
+
+
+def tree(root):
+    return {
+        path.relative_to(root).as_posix(): path.read_text()
+        for path in Path(root).rglob("*")
+        if path.is_file() and ".git" not in path.parts
+    }
+
+
+def read_tar(path):
+    if path.endswith(".zst") and sys.version_info < (3, 14):
+        import zstandard
+
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        tar = tarfile.open(fileobj=stream, mode="r|")
+    else:
+        tar = tarfile.open(path)
+    with tar:
+        return {
+            member.name: tar.extractfile(member).read().decode()
+            for member in tar
+            if member.isfile()
+        }
+
+
+def test_zip_matches_tree(tmpfolder):
+    generate("proj", "--jaustinpage-archive", "out/proj.zip", "--jaustinpage")
+    assert not Path("out/proj").exists()
+    archive.close_archives()
+    generate("out/proj", "--jaustinpage")
+    with zipfile.ZipFile("out/proj.zip") as zip_file:
+        names = zip_file.namelist()
+        files = {
+            name: zip_file.read(name).decode()
+            for name in names
+            if not name.endswith("/")
+        }
+    assert {f"proj/{path}": content for path, content in tree("out/proj").items()} == (
+        files
+    )
+    assert "proj/src/proj/" in names
+    assert "archive" not in files["proj/setup.cfg"]
+    assert '"Makefile": [' in files[f"proj/{LOCKFILE}"]
+
+
+@pytest.mark.parametrize("suffix", [".tar", ".tar.gz", ".tar.xz", ".tar.zst"])
+def test_many_projects(tmpfolder, suffix):
+    for name in ["alpha", "beta"]:
+        opts = {
+            "project_path": f"projects/{name}",
+            "config_files": api.NO_CONFIG,
+            "extensions": [Jaustinpage()],
+            archive.ARCHIVE: f"projects{suffix}",
+        }
+        api.create_project(opts)
+    assert not Path("projects").exists()
+    archive.close_archives()
+    files = read_tar(f"projects{suffix}")
+    assert "[tool.importtime]" in files["alpha/pyproject.toml"]
+    assert "name = beta" in files["beta/setup.cfg"]
+    assert files["alpha/Makefile"] == files["beta/Makefile"]
+
+
+def test_same_project_twice(tmpfolder):
+    generate("proj", "--jaustinpage-archive", "out.tar")
+    with pytest.raises(archive.ArchiveError, match="proj is already in"):
+        generate("proj", "--jaustinpage-archive", "out.tar")
+
+
+def test_unknown_format(tmpfolder):
+    with pytest.raises(archive.ArchiveError, match="unknown archive format"):
+        generate("proj", "--jaustinpage-archive", "out.rar")
+
+
+def test_zstd_missing(tmpfolder, monkeypatch):
+    monkeypatch.setitem(sys.modules, "compression.zstd", None)
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(archive.ArchiveError, match="zstandard"):
+        generate("proj", "--jaustinpage-archive", "out.tar.zst")
+
+
+def test_members():
+    struct = {"a": Template("$name"), "empty": None, "src": {"b": ("b", None)}}
+    members = list(archive.members(struct, {"name": "proj"}, {}))
+    assert members == [("a", "proj"), ("src/", None), ("src/b", "b")]
+
+
+def test_pretend(tmpfolder):
+    generate("proj", "--jaustinpage-archive", "out.zip", "--pretend")
+    assert not Path("out.zip").exists()
@@ -0,0 +1,89 @@
+"""Test column-oriented batch rendering."""
+import pytest
+
+from pyscaffoldext.jaustinpage import batch
+from pyscaffoldext.jaustinpage.extension import ADD_FILES
+from pyscaffoldext.jaustinpage.render import CompiledTemplate
+from pyscaffoldext.jaustinpage.templates import compiled
+
+ROWS = [
+    {"name": "alpha", "package": "alpha", "qual_pkg": "my.ns.alpha", "version": "1"},
+    {"name": "beta", "package": "beta", "qual_pkg": "beta", "version": "1"},
+    {"name": "alpha", "package": "alpha", "qual_pkg": "my.ns.alpha", "version": "2"},
+]
+
+
+@pytest.fixture()
+def renders(monkeypatch):
+    rendered = []
+    render = CompiledTemplate.render
+
+    def _render(self, opts, safe=False):
+        rendered.append(self)
+        return render(self, opts, safe)
+
+    monkeypatch.setattr(CompiledTemplate, "render", _render)
+    return rendered
+
+
+def test_render_once_per_combination(renders):
+    columns = batch.columns_from_rows(ROWS * 100)
+    profiling = compiled("profiling.py")  # uses name and qual_pkg only
+    contents = batch.render_batch(profiling, columns)
+    assert len(contents) == 300
+    assert len(renders) == 2
+    assert contents[0] is contents[2]
+    assert contents == [profiling.render(row, safe=True) for row in ROWS * 100]
+
+
+def test_render_without_placeholders_once(renders):
+    columns = batch.columns_from_rows(ROWS * 100)
+    contents = batch.render_batch(compiled("gitignore"), columns)
+    assert len(renders) == 1
+    assert all(content is contents[0] for content in contents)
+    assert "*$py.class" in contents[0]  # no column, left as it is
+
+
+def test_render_files(renders):
+    columns = batch.columns_from_rows(ROWS)
+    files = batch.render_files(columns)
+    assert list(files) == ADD_FILES
+    by_name = [".run/pytest debug.run.xml", ".run/tox.run.xml"]  # alpha and beta
+    assert len(renders) == len(ADD_FILES) + len(by_name)
+    for path, contents in files.items():
+        template = compiled(path.split("/")[-1].strip("."))
+        assert contents == [template(row) for row in ROWS]
+        assert len({id(content) for content in contents}) == 1 + (path in by_name)
+
+
+def test_values_rendered_as_strings():
+    template = compiled("test_init.py")
+    columns = {"qual_pkg": [["a", "b"], ["a", "b"], 1]}
+    contents = batch.render_batch(template, columns)
+    assert contents[0] is contents[1]
+    assert "['a', 'b']" in contents[0]
+    assert contents[2] == template({"qual_pkg": 1})
+
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "projects.csv"
+    path.write_text("name,qual_pkg\nalpha,my.ns.alpha\nbeta,beta\n")
+    columns = batch.read_csv(path)
+    assert columns == {"name": ["alpha", "beta"], "qual_pkg": ["my.ns.alpha", "beta"]}
+    assert batch.batch_size(columns) == 2
+
+
+def test_columns_of_different_lengths():
+    with pytest.raises(ValueError, match=r"name: 2, qual_pkg: 1"):
+        batch.render_files({"name": ["a", "b"], "qual_pkg": ["a"]})
+
+
+def test_empty_batch():
+    assert batch.batch_size({}) == 0
+    assert batch.columns_from_rows([]) == {}
+    assert batch.render_batch(compiled("gitignore"), {"name": []}) == []
+
+
+def test_missing_option():
+    with pytest.raises(KeyError, match="qual_pkg"):
+        batch.columns_from_rows([{"qual_pkg": "a"}, {"name": "b"}])
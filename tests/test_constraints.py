@@ -0,0 +1,225 @@
+"""Test pinned constraints."""
+import json
+import os
+import runpy
+import shutil
+import subprocess  # noqa: S404
+import sys
+import time
+from pathlib import Path
+
+from pyscaffold import cli
+
+from pyscaffoldext.jaustinpage import constraints
+from pyscaffoldext.jaustinpage.constraints import (
+    PLATFORM,
+    PYTHON,
+    Pin,
+    format_requirements,
+    interpreter,
+    resolve,
+)
+from pyscaffoldext.jaustinpage.extension import (
+    BUILD_PACKAGES,
+    PINNED_PACKAGES,
+    Jaustinpage,
+)
+from pyscaffoldext.jaustinpage.lockfile import read_lockfile
+
+from .conftest import FAKE_PINS
+
+EXT_FLAGS = [Jaustinpage().flag]
+BUILD_PINS = [Pin("build", "1.0.0", "b" * 64), Pin("wheel", "2.0.0", "c" * 64)]
+
+
+def generate(name):
+    cli.main([name, "--no-config", *EXT_FLAGS])
+    # --no-config: avoid extra config from dev's machine interference
+
+
+def resolve_build(monkeypatch, failing=()):
+    """Pin the build requirements with hashes, except with the failing executables."""
+    fake_resolve = constraints.resolve
+
+    def _resolve(requirements, executable):
+        pins = fake_resolve(requirements, executable)
+        if tuple(requirements) != tuple(sorted(BUILD_PACKAGES)):
+            return pins
+        if executable in failing:
+            raise subprocess.CalledProcessError(1, ["pip"])
+        return BUILD_PINS
+
+    monkeypatch.setattr(constraints, "resolve", _resolve)
+
+
+def test_constraints_generated(tmpfolder, resolutions):
+    generate("proj_a")
+    generate("proj_b")
+    pinned = tuple(sorted(set(PINNED_PACKAGES)))
+    assert resolutions == [
+        (tuple(sorted(BUILD_PACKAGES)), "/usr/bin/python3.8"),
+        (tuple(sorted(BUILD_PACKAGES)), sys.executable),
+        (pinned, "/usr/bin/python3.8"),
+        (pinned, sys.executable),
+    ]
+    lines = Path("proj_a/constraints.txt").read_text().splitlines()
+    assert lines[0].startswith("# Generated by pyscaffoldext-jaustinpage")
+    assert lines[0].endswith(f"requirements, for 3.8, {PYTHON}.")
+    assert lines[3:] == [
+        f'flake8==1.0.0 ; python_version == "3.8"  # sha256:{"a" * 64}',
+        'pytest==2.0.0 ; python_version == "3.8"',
+        f'flake8==1.0.0 ; python_version == "{PYTHON}"  # sha256:{"a" * 64}',
+        f'pytest==2.0.0 ; python_version == "{PYTHON}"',
+    ]
+    assert Path("proj_b/constraints.txt").read_text() == "\n".join(lines) + "\n"
+    assert read_lockfile(Path("proj_a"))["constraints.txt"][0] is None
+
+
+def test_build_requirements_generated(tmpfolder, monkeypatch, caplog):
+    resolve_build(monkeypatch, failing={sys.executable})
+    generate("proj_a")
+    name = f"py38-{PLATFORM}.txt"
+    files = list(Path("proj_a/build-requirements").iterdir())
+    assert [path.name for path in files] == [name]  # the running Python failed
+    assert f"Could not pin the requirements for Python {PYTHON}" in caplog.text
+    lines = Path("proj_a/build-requirements", name).read_text().splitlines()
+    assert lines[0].endswith(f"for Python 3.8 on {PLATFORM}, from 4 requirements.")
+    assert lines[1].endswith("the hashes are checked.")
+    assert lines[2:] == [
+        f"build==1.0.0 --hash=sha256:{'b' * 64}",
+        f"wheel==2.0.0 --hash=sha256:{'c' * 64}",
+    ]
+    lockfile = read_lockfile(Path("proj_a"))
+    assert lockfile[f"build-requirements/{name}"][0] is None
+
+
+def test_build_requirements_need_hashes(tmpfolder):
+    generate("proj_a")  # the fake pytest pin has no hash
+    assert constraints.pins(BUILD_PACKAGES) == tuple(FAKE_PINS)
+    assert not Path("proj_a/build-requirements").exists()
+
+
+def test_requirements_hash_checked():
+    pins = [Pin("build", "1.0.0", "a" * 64), Pin("wheel", "2.0.0", "b" * 64)]
+    lines = format_requirements(pins, ["build", "wheel"]).splitlines()
+    assert lines[2:] == [
+        f"build==1.0.0 --hash=sha256:{'a' * 64}",
+        f"wheel==2.0.0 --hash=sha256:{'b' * 64}",
+    ]
+    assert format_requirements([], ["wheel", "build"]).splitlines()[2:] == [
+        "build",
+        "wheel",
+    ]
+
+
+def test_resolution_cached_on_disk(resolutions):
+    content = constraints.constraints(["pytest", "flake8", "pytest"])
+    constraints._cached_pins.cache_clear()
+    assert constraints.constraints(["flake8", "pytest"]) == content
+    requirements = ("flake8", "pytest")
+    assert resolutions == [
+        (requirements, "/usr/bin/python3.8"),
+        (requirements, sys.executable),
+    ]
+    assert len(list(constraints.cache_dir().iterdir())) == 2
+
+
+def test_unresolvable(resolutions, monkeypatch, caplog):
+    def _fail(requirements, executable):
+        resolutions.append((requirements, executable))
+        raise subprocess.CalledProcessError(1, ["pip"])
+
+    monkeypatch.setattr(constraints, "resolve", _fail)
+    content = constraints.constraints(["not-a-package"])
+    assert content.splitlines()[0].endswith("for no Python version.")
+    assert content.splitlines()[3:] == []
+    assert "Could not pin the requirements for Python 3.8" in caplog.text
+    assert "Python 3.6" not in caplog.text  # not installed
+    assert len(resolutions) == 2
+    constraints._cached_pins.cache_clear()
+    assert constraints.constraints(["not-a-package"]) == content
+    assert len(resolutions) == 2  # the failures are cached
+    failed = sorted(constraints.cache_dir().glob("*.failed"))
+    assert len(failed) == 2
+    expired = time.time() - constraints.FAILURE_TTL - 1
+    os.utime(failed[0], (expired, expired))
+    constraints._cached_pins.cache_clear()
+    constraints.constraints(["not-a-package"])
+    assert len(resolutions) == 3
+    assert not list(constraints.cache_dir().glob("*.json"))
+
+
+def test_pythons():
+    versions = constraints.pythons()
+    assert versions[:5] == ["3.6", "3.7", "3.8", "3.9", "3.10"]
+    assert PYTHON in versions
+
+
+def test_interpreter(monkeypatch):
+    def _run(args, **kwargs):
+        if args[0] == "/usr/bin/python3.7":  # a shim of a version not installed
+            raise subprocess.CalledProcessError(127, args)
+        assert args[1:] == ["-c", "pass"]
+
+    paths = {"python3.6": "/usr/bin/python3.6", "python3.7": "/usr/bin/python3.7"}
+    monkeypatch.setattr(shutil, "which", paths.get)
+    monkeypatch.setattr(subprocess, "run", _run)
+    interpreter.cache_clear()
+    assert interpreter(PYTHON) == sys.executable
+    assert interpreter("3.6") == "/usr/bin/python3.6"
+    assert interpreter("3.7") is None
+    assert interpreter("3.8") is None
+    interpreter.cache_clear()
+
+
+def test_pip_install_script(tmpfolder, monkeypatch):
+    resolve_build(monkeypatch)
+    generate("proj_a")
+    calls = []
+    monkeypatch.setattr(subprocess, "call", lambda command: calls.append(command))
+    script = runpy.run_path("proj_a/scripts/pip_install.py")
+    script["main"](["pytest"])
+    script["main"](["--build-requirements", "--pre", "build"])
+    Path("proj_a/constraints.txt").unlink()
+    shutil.rmtree("proj_a/build-requirements")
+    script["main"](["pytest"])
+    script["main"](["--build-requirements", "build"])
+    pip = [sys.executable, "-m", "pip", "install"]
+    project = tmpfolder.resolve() / "proj_a"
+    constraints_txt = str(project / "constraints.txt")
+    requirements = project / "build-requirements"
+    requirements_txt = str(requirements / constraints.build_requirements_name(PYTHON))
+    assert calls == [
+        [*pip, "-c", constraints_txt, "pytest"],
+        [*pip, "--pre", "-r", requirements_txt],
+        [*pip, "pytest"],
+        [*pip, "build"],
+    ]
+
+
+def test_resolve(monkeypatch):
+    report = {
+        "install": [
+            {
+                "metadata": {"name": "Pytest", "version": "2.0.0"},
+                "download_info": {"url": "file:///pytest", "dir_info": {}},
+            },
+            {
+                "metadata": {"name": "flake8", "version": "1.0.0"},
+                "download_info": {"archive_info": {"hashes": {"sha256": "b" * 64}}},
+            },
+        ]
+    }
+
+    def _run(args, **kwargs):
+        assert args[0] == "/usr/bin/python3.8"
+        assert args[3:6] == ["install", "--quiet", "--dry-run"]
+        assert args[-6:-2] == ["--retries", "0", "--timeout", "5"]
+        assert args[-1] == "pytest"
+        Path(args[args.index("--report") + 1]).write_text(json.dumps(report))
+
+    monkeypatch.setattr(subprocess, "run", _run)
+    assert resolve(["flake8", "pytest"], "/usr/bin/python3.8") == [
+        constraints.Pin("flake8", "1.0.0", "b" * 64),
+        constraints.Pin("pytest", "2.0.0", ""),
+    ]
@@ -1,15 +1,33 @@
 """Test extension."""
 
+import json
+import os
+import runpy
+import shutil
+import subprocess  # noqa: S404
+import sys
+import zipfile
 from pathlib import Path
 
+import coverage
 import pytest
+import toml
 from pyscaffold import cli
 from pyscaffold.file_system import chdir
+from pyscaffold.shell import git
+from pyscaffold.templates import get_template
 
-from pyscaffoldext.jaustinpage import templates
-from pyscaffoldext.jaustinpage.extension import Jaustinpage
+from pyscaffoldext.jaustinpage import extension, templates
+from pyscaffoldext.jaustinpage.extension import (
+    BUILD_PACKAGES,
+    IMPORT_BUDGET_MS,
+    NAMESPACE_BUDGET_MS,
+    Jaustinpage,
+)
+from pyscaffoldext.jaustinpage.lockfile import read_lockfile
+from pyscaffoldext.jaustinpage.render import CompiledTemplate
 
-from .helpers import run_common_tasks
+from .helpers import PYTHON, run, run_common_tasks
 
 EXT_FLAGS = [Jaustinpage().flag]
 
@@ -51,6 +69,359 @@ def test_setup_cfg_modified(tmpfolder):
     assert "Source = https://github.com/jaustinpage" in setup_cfg_text
     assert "license = MIT" in setup_cfg_text
     assert "pytest-mock" in setup_cfg_text
+    assert "jobs = auto" in setup_cfg_text
+    assert "per-file-ignores = tests/*: ABS101" in setup_cfg_text
+    assert "\nformatting =\n" in setup_cfg_text
+    assert "\nlinting =\n" in setup_cfg_text
+
+
+def test_cached_lint_added(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    assert Path("my_project/scripts/flake8_cached.py").exists()
+    lint_command = "python scripts/flake8_cached.py src/ tests/"
+    assert lint_command in Path("my_project/tox.ini").read_text()
+    assert lint_command in Path("my_project/Makefile").read_text()
+    noxfile = Path("my_project/noxfile.py").read_text()
+    assert "session.run(*FLAKE8_CACHED_EXE, *LINT_FILES)" in noxfile
+
+
+def test_cached_lint_config(tmpfolder):
+    cli.main(["my_project", "--no-config", *EXT_FLAGS])
+    # --no-config: avoid extra config from dev's machine interference
+    script = runpy.run_path("my_project/scripts/flake8_cached.py")
+    with chdir("my_project"):
+        salt = script["cache_salt"]([])
+        pyproject = Path("pyproject.toml")
+        pyproject.write_text(pyproject.read_text().replace("88", "100"))
+        assert script["cache_salt"]([]) != salt
+
+
+def test_nox_sessions(tmpfolder):
+    pytest.importorskip("nox")
+    cli.main(["my_project", "--no-config", *EXT_FLAGS])
+    # --no-config: avoid extra config from dev's machine interference
+    with chdir("my_project"):
+        sessions = run(PYTHON, "-m", "nox", "--list")
+        for session in [
+            "default",
+            "release",
+            "test_changed",
+            "test_impact_map",
+            "coverage_changed",
+            "pre_commit",
+            "lint",
+            "profile",
+            "build_cached",
+            "build_verify",
+        ]:
+            assert f" {session}" in sessions
+        Path("dist").mkdir()
+        run(PYTHON, "-m", "nox", "-s", "clean")
+        assert not Path("dist").exists()
+
+
+def test_profiling_added(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    assert Path("my_project/src/my_package/profiling.py").exists()
+    assert Path("my_project/tests/test_profiling.py").exists()
+    skeleton_text = Path("my_project/src/my_package/skeleton.py").read_text()
+    assert "from my_package.profiling import profiled" in skeleton_text
+    assert "\nprofile:\n" in Path("my_project/Makefile").read_text()
+
+
+def test_fib_exemplar_added(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    skeleton_text = Path("my_project/src/my_package/skeleton.py").read_text()
+    assert "def fib_batch(" in skeleton_text
+    assert "def fib_cached(" in skeleton_text
+    assert Path("my_project/tests/bench_skeleton.py").exists()
+
+
+def test_import_time_budget_added(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    pyproject = toml.loads(Path("my_project/pyproject.toml").read_text())
+    assert pyproject["tool"]["importtime"]["budget_ms"] == IMPORT_BUDGET_MS
+    assert Path("my_project/tests/test_import_time.py").exists()
+    assert "def import_time(" in Path("my_project/tests/conftest.py").read_text()
+
+
+def test_incremental_docs(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    tox_ini = Path("my_project/tox.ini").read_text()
+    assert "sphinx.cmd.build -j auto -b" in tox_ini
+    assert "py39-{doctests,pdf}: py39-docs" in tox_ini
+    assert "docs,doctests,build}\n" in tox_ini
+    assert "tox -e $(TOX_PYTHON)-pdf" in Path("my_project/Makefile").read_text()
+    conf_py = Path("my_project/docs/conf.py").read_text()
+    assert extension.APIDOC_RMTREE not in conf_py
+    assert "run_apidoc(apidoc.main, args, output_dir)" in conf_py
+    assert "\nimport filecmp" not in conf_py  # imported in run_apidoc, no E402
+
+
+def test_docs_conf_anchors():
+    # configure_docs_conf leaves conf.py unchanged when PyScaffold's section changes
+    sphinx_conf = get_template("sphinx_conf").template
+    assert extension.APIDOC_RMTREE in sphinx_conf
+    assert extension.APIDOC_MAIN in sphinx_conf
+
+
+def test_run_apidoc_writes_changed_pages_only(tmpfolder):
+    source = templates.template("conf_apidoc.py").template
+    namespace = {"os": os, "shutil": shutil}
+    exec(source, namespace)  # noqa: S102
+    pages = {"modules.rst": "modules", "my_package.rst": "package"}
+
+    def main(args):
+        for name, text in pages.items():
+            Path(args[-1], name).write_text(text)
+
+    api = tmpfolder / "api"
+    namespace["run_apidoc"](main, ["-o", str(api)], str(api))
+    (api / "stale.rst").write_text("stale")
+    (api / "stale").mkdir()
+    os.utime(api / "modules.rst", ns=(0, 0))
+    pages["my_package.rst"] = "changed"
+    namespace["run_apidoc"](main, ["-o", str(api)], str(api))
+
+    assert sorted(p.name for p in api.iterdir()) == sorted(pages)
+    assert (api / "modules.rst").stat().st_mtime_ns == 0
+    assert (api / "my_package.rst").read_text() == "changed"
+
+
+def test_unknown_docs_conf_unchanged():
+    assert extension.configure_docs_conf("project = 'x'\n", {}) == "project = 'x'\n"
+
+
+def test_compare_wheels_added(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    tox_ini = Path("my_project/tox.ini").read_text()
+    assert "python -m build --no-isolation --sdist --wheel ." in tox_ini
+    assert "scripts/pip_install.py --build-requirements {opts}" in tox_ini
+    assert "\n    ".join(["deps =", *BUILD_PACKAGES]) + "\ncommands" in tox_ini
+    noxfile = Path("my_project/noxfile.py").read_text()
+    assert f"BUILD_PACKAGES = {json.dumps(BUILD_PACKAGES)}\n" in noxfile
+    members = {"my_package/__init__.py": "", "my_package-1.dist-info/WHEEL": "a"}
+    for dist in ("cached", "isolated"):
+        Path(dist).mkdir()
+        with zipfile.ZipFile(f"{dist}/my_package-1.whl", "w") as wheel:
+            for name, text in members.items():
+                wheel.writestr(name, text)
+        members = {**members, "my_package-1.dist-info/WHEEL": "b"}
+
+    def compare(*dists):
+        script = "my_project/scripts/compare_wheels.py"
+        command = [sys.executable, script, *dists]
+        return subprocess.run(command, stdout=subprocess.PIPE, text=True)  # noqa: S603
+
+    same = compare("cached", "isolated")
+    assert same.returncode == 0
+    assert "same contents: my_package-1.whl" in same.stdout
+    with zipfile.ZipFile("isolated/my_package-1.whl", "a") as wheel:
+        wheel.writestr("my_package/skeleton.py", "")
+    assert "my_package/skeleton.py differs" in compare("cached", "isolated").stdout
+    assert compare("isolated", "cached").returncode == 1
+    assert compare("isolated", "my_project").returncode == 1
+    Path("cached/my_package-1.whl").unlink()
+    assert "is missing" in compare("cached", "isolated").stdout
+
+
+def test_coverage_profiles(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    assert "COVERAGE_CORE = {env:COVERAGE_CORE:sysmon}" in Path(
+        "my_project/tox.ini"
+    ).read_text()
+    coveragerc = Path("my_project/.coveragerc").read_text()
+    assert "branch = True\ndisable_warnings = no-sysmon\n" in coveragerc
+    assert extension.configure_coveragerc(coveragerc, {}) == coveragerc
+    no_branch = extension.configure_coveragerc("[run]\nsource = my_package\n", {})
+    assert no_branch == "[run]\nsource = my_package\ndisable_warnings = no-sysmon\n"
+    assert Path("my_project/tests/bench_coverage.py").exists()
+
+    script = runpy.run_path("my_project/scripts/coverage_changed.py")
+    with chdir("my_project"):
+        assert script["changed_modules"]("HEAD") == []
+        with Path("src/my_package/skeleton.py").open("a") as skeleton:
+            skeleton.write("# changed\n")
+        Path("src/my_package/sub").mkdir()
+        Path("src/my_package/sub/__init__.py").write_text("")
+        Path("src/my_package/notes.txt").write_text("")
+        expected = ["my_package.skeleton", "my_package.sub"]
+        assert script["changed_modules"]("HEAD") == expected
+        script["line_coverage_config"](Path("line.ini"))
+        line = Path("line.ini").read_text()
+        assert "branch = False" in line
+        assert "source = my_package" in line
+
+
+def test_test_impact(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    assert "changed: pytest --changed-since {posargs:HEAD}" in Path(
+        "my_project/tox.ini"
+    ).read_text()
+    assert "pytest --changed-since $(SINCE)" in Path("my_project/Makefile").read_text()
+
+    script = runpy.run_path("my_project/scripts/test_impact.py")
+    data = coverage.CoverageData(no_disk=True)
+    skeleton = str(Path("my_project/src/my_package/skeleton.py").resolve())
+    installed = "/venv/lib/python3.9/site-packages/my_package/profiling.py"
+    for context, files in [
+        ("tests/test_skeleton.py::test_fib|run", [skeleton]),
+        ("tests/test_profiling.py::test_main|setup", [installed, skeleton]),
+    ]:
+        data.set_context(context)
+        data.add_lines({filename: [1] for filename in files})
+    with chdir("my_project"):
+        assert script["impact_map"](data) == {
+            "tests/test_profiling.py::test_main": [
+                "src/my_package/profiling.py",
+                "src/my_package/skeleton.py",
+            ],
+            "tests/test_skeleton.py::test_fib": ["src/my_package/skeleton.py"],
+        }
+
+    conftest = runpy.run_path("my_project/tests/conftest.py")
+    impact = {"tests/test_a.py::test_a": ["src/my_package/a.py"]}
+    assert conftest["affected"]("tests/test_b.py::test_b", set(), impact)
+    assert not conftest["affected"]("tests/test_a.py::test_a", set(), impact)
+    assert conftest["affected"]("tests/test_a.py::test_a", {"tests/test_a.py"}, impact)
+    changed = set(impact["tests/test_a.py::test_a"])
+    assert conftest["affected"]("tests/test_a.py::test_a", changed, impact)
+    assert [
+        conftest["affects_all"](path)
+        for path in ["tests/conftest.py", "tests/test_a.py", "src/my_package/a.py"]
+    ] == [True, False, False]
+    assert conftest["affects_all"]("src/my_package/data.json")
+    assert conftest["affects_all"]("setup.cfg")
+    assert not conftest["affects_all"]("README.md")
+
+
+LOCAL_HOOKS = """\
+repos:
+-   repo: local
+    hooks:
+    -   id: compile
+        name: compile the python files
+        entry: python -m py_compile
+        language: python
+        types: [python]
+        additional_dependencies: [toml]
+"""
+# ^  a hook environment that pip can install without fetching a hook repository
+
+
+def tox_pre_commit(env):
+    """Run ``tox -e pre-commit`` and list the hook environments in the store.
+
+    :param env: environment of tox, with the ``PRE_COMMIT_HOME`` of the store
+    :returns: the output of tox and the modification time of each hook environment
+    """
+    Path(".pre-commit-config.yaml").write_text(LOCAL_HOOKS)
+    git("add", ".pre-commit-config.yaml")
+    output = run(PYTHON, "-m", "tox", "-e", "pre-commit", env=env)
+    store = Path(env["PRE_COMMIT_HOME"])
+    # db.db records the configs that ran on each run, the repo* directories hold the
+    # hook environments
+    return output, {path.name: path.stat().st_mtime_ns for path in store.glob("repo*")}
+
+
+def nox_pre_commit_env(env, monkeypatch):
+    """Environment that ``nox -s pre_commit`` runs the hooks with."""
+    runs = []
+
+    class Session:
+        posargs = []
+
+        def install(self, *args):
+            pass
+
+        def run(self, *args, env=None):
+            runs.append((args, env))
+
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    noxfile = runpy.run_path("noxfile.py")
+    noxfile["pre_commit"](Session())
+    (args, run_env), *_ = runs
+    assert args[:2] == ("pre-commit", "run")
+    return run_env
+
+
+def test_pre_commit_home_shared(tmpfolder, monkeypatch):
+    pytest.importorskip("tox")
+    for project in ("first", "second"):
+        cli.main([project, "--no-config", "--pre-commit", *EXT_FLAGS])
+    env = {**os.environ, "PRE_COMMIT_HOME": str(tmpfolder / "store")}
+    with chdir("first"):
+        output, installed = tox_pre_commit(env)
+    assert "Installing environment" in output
+    assert installed
+    with chdir("second"):
+        output, reused = tox_pre_commit(env)
+    assert "Installing environment" not in output
+    assert reused == installed
+
+    pytest.importorskip("nox")
+    cache = str(tmpfolder / "cache")
+    monkeypatch.delenv("PRE_COMMIT_HOME", raising=False)
+    with chdir("second"):
+        run_env = nox_pre_commit_env({"XDG_CACHE_HOME": cache}, monkeypatch)
+    assert run_env == {"PRE_COMMIT_HOME": f"{cache}/pre-commit"}
+
+
+def test_lazy_init(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", "--jaustinpage-lazy-init"]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    init_text = Path("my_project/src/my_package/__init__.py").read_text()
+    assert "def __getattr__(" in init_text
+    assert "\n__version__ =" not in init_text  # only assigned eagerly on Python 3.6
+    pyproject = toml.loads(Path("my_project/pyproject.toml").read_text())
+    write_to = pyproject["tool"]["setuptools_scm"]["write_to"]
+    assert write_to == "src/my_package/version.py"
+    assert "jaustinpage_lazy_init = True" in Path("my_project/setup.cfg").read_text()
+    assert Path("my_project/tests/test_init.py").exists()
+
+
+def test_lazy_init_before_python37(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", "--jaustinpage-lazy-init"]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    Path("my_project/src/my_package/version.py").write_text("version = '1.2'\n")
+    check = (
+        "import sys; sys.version_info = (3, 6, 15); sys.path.insert(0, 'src'); "
+        "import my_package; "
+        "print(vars(my_package)['__version__'], *sorted(vars(my_package)))"
+    )
+    with chdir("my_project"):
+        version, *names = run(PYTHON, "-c", check).split()
+    assert version == "1.2"
+    assert {"profiling", "skeleton"} <= set(names)
+    assert "_submodule" not in names
+
+
+def test_eager_init_by_default(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    # --no-config: avoid extra config from dev's machine interference
+    cli.main(args)
+    init_text = Path("my_project/src/my_package/__init__.py").read_text()
+    assert "__version__ = version(dist_name)" in init_text
+    assert not Path("my_project/tests/test_init.py").exists()
 
 
 def test_add_custom_extension_and_pretend(tmpfolder):
@@ -61,6 +432,46 @@ def test_add_custom_extension_and_pretend(tmpfolder):
     assert not Path("my_project").exists()
 
 
+@pytest.fixture()
+def renders(monkeypatch):
+    rendered = []
+
+    def _spy(name, render):
+        def _render(*args, **kwargs):
+            rendered.append(name)
+            return render(*args, **kwargs)
+
+        return _render
+
+    monkeypatch.setattr(
+        CompiledTemplate, "render", _spy("template", CompiledTemplate.render)
+    )
+    for configure in ("configure_setup_cfg", "configure_pyproject_toml"):
+        spy = _spy(configure, getattr(extension, configure))
+        monkeypatch.setattr(extension, configure, spy)
+    return rendered
+
+
+def test_pretend_renders_nothing(tmpfolder, renders):
+    args = ["my_project", "--no-config", "--pretend", "-p", "my_package", *EXT_FLAGS]
+    cli.main(args)
+    assert renders == []
+
+
+def test_update_renders_written_files_only(tmpfolder, renders):
+    args = ["my_project", "--no-config", "-p", "my_package", *EXT_FLAGS]
+    cli.main(args)
+    templated = [e for e in read_lockfile(Path("my_project")).values() if e[0]]
+    assert renders.count("template") == len(templated) + 1  # with docs/conf.py
+    renders.clear()
+    Path("my_project/Makefile").unlink()
+    with chdir("my_project"):
+        git("commit", "-qam", "Remove Makefile")
+    cli.main([*args, "--update"])
+    assert renders.count("template") == 3  # Makefile, __init__.py and docs/conf.py
+    assert Path("my_project/Makefile").exists()
+
+
 def test_add_custom_extension_with_namespace(tmpfolder):
     args = [
         "my_project",
@@ -74,10 +485,48 @@ def test_add_custom_extension_with_namespace(tmpfolder):
     cli.main(args)
 
     assert Path("my_project/src/my/ns/my_package/__init__.py").exists()
+    assert not Path("my_project/src/my/__init__.py").exists()
+    assert not Path("my_project/tests/test_namespace_import.py").exists()
+
+
+def test_fast_namespace(tmpfolder):
+    args = [
+        "my_project",
+        "--no-config",  # avoid extra config from dev's machine interference
+        "--package",
+        "my_package",
+        "--namespace",
+        "my.ns",
+        "--jaustinpage-fast-namespace",
+    ]
+    cli.main(args)
+
+    for level in ("my", "my/ns"):
+        init = Path(f"my_project/src/{level}/__init__.py").read_text()
+        assert "a regular package for import speed" in init
+    assert Path("my_project/src/my/ns/my_package/skeleton.py").exists()
+    pyproject = toml.loads(Path("my_project/pyproject.toml").read_text())
+    budget_ms = pyproject["tool"]["importtime"]["namespace_budget_ms"]
+    assert budget_ms == NAMESPACE_BUDGET_MS
+    test_text = Path("my_project/tests/test_namespace_import.py").read_text()
+    assert 'NAMESPACE = "my.ns".split(".")' in test_text
+    setup_cfg_text = Path("my_project/setup.cfg").read_text()
+    assert "jaustinpage_fast_namespace = True" in setup_cfg_text
+
+
+def test_fast_namespace_without_namespace(tmpfolder):
+    args = ["my_project", "--no-config", "-p", "my_package"]
+    cli.main([*args, "--jaustinpage-fast-namespace"])
+    # --no-config: avoid extra config from dev's machine interference
+    assert Path("my_project/src/my_package/__init__.py").exists()
+    assert not Path("my_project/tests/test_namespace_import.py").exists()
+    pyproject = toml.loads(Path("my_project/pyproject.toml").read_text())
+    assert "namespace_budget_ms" not in pyproject["tool"]["importtime"]
 
 
 # To use marks make sure to uncomment them in setup.cfg
 # @pytest.mark.slow
+@pytest.mark.real_resolution  # tox installs the pinned versions
 def test_generated_extension(tmpfolder):
     args = [
         "myproject",
@@ -0,0 +1,129 @@
+"""Test drift scanner."""
+import json
+from pathlib import Path
+from string import Template
+
+from configupdater import ConfigUpdater
+from pyscaffold import cli
+
+from pyscaffoldext.jaustinpage import drift
+from pyscaffoldext.jaustinpage.extension import Jaustinpage
+from pyscaffoldext.jaustinpage.render import Deferred
+
+EXT_FLAGS = [Jaustinpage().flag]
+
+
+def generate(*names, extra_args=()):
+    for name in names:
+        cli.main([name, "--no-config", *extra_args, *EXT_FLAGS])
+        # --no-config: avoid extra config from dev's machine interference
+
+
+def scan_report(capsys, *args):
+    capsys.readouterr()  # drop the output of the project generation
+    exit_code = drift.main(list(args))
+    return exit_code, json.loads(capsys.readouterr().out)
+
+
+def test_no_drift(tmpfolder, capsys):
+    generate("proj_a", "proj_b")
+    generate("proj_ns", extra_args=["--namespace", "my.ns"])
+    exit_code, report = scan_report(capsys, "--all", "proj_*")
+    assert exit_code == 0
+    assert [r["repo"] for r in report] == ["proj_a", "proj_b", "proj_ns"]
+    assert not any(r["drifted"] for r in report)
+
+
+def test_drift_detected(tmpfolder, capsys):
+    generate("proj_a", "proj_b")
+    Path("proj_a/tox.ini").unlink()
+    with Path("proj_a/Makefile").open("a") as makefile:
+        makefile.write("custom:\n\techo hi\n")
+    setup_cfg = Path("proj_a/setup.cfg")
+    updater = ConfigUpdater()
+    updater.read(str(setup_cfg))
+    updater["flake8"]["jobs"] = "4"
+    updater.remove_section("coverage.paths")
+    setup_cfg.write_text(str(updater))
+    pyproject = Path("proj_a/pyproject.toml")
+    pyproject.write_text(pyproject.read_text().replace("report_top = 10", ""))
+
+    exit_code, report = scan_report(capsys, "proj_*")
+    assert exit_code == 1
+    assert len(report) == 1
+    assert report[0]["files"] == {"Makefile": "drifted", "tox.ini": "missing"}
+    assert report[0]["setup.cfg"] == {
+        "flake8": ["jobs"],
+        "coverage.paths": ["source"],
+    }
+    assert report[0]["pyproject.toml"] == {"tool.importtime": ["report_top"]}
+
+
+def test_broken_repo_reported(tmpfolder, capsys):
+    Path("not_generated").mkdir()
+    Path("not_generated/setup.cfg").write_text("[metadata]\nname = x\n")
+    Path("not_a_repo").mkdir()
+    exit_code, report = scan_report(capsys, "not_*")
+    assert exit_code == 1
+    assert [r["repo"] for r in report] == ["not_generated"]
+    assert "error" in report[0]
+
+
+def test_rendered_once_per_opts(tmpfolder):
+    generate("proj_a", "proj_b")
+    drift.expected_hashes.cache_clear()
+    drift.scan(drift.find_roots(["proj_a", "proj_b", "proj_a"]), workers=1)
+    assert drift.expected_hashes.cache_info().misses == 2
+    drift.scan(drift.find_roots(["proj_a"]), workers=1)
+    assert drift.expected_hashes.cache_info().misses == 2
+
+
+def test_update_diff(tmpfolder, capsys):
+    generate("proj_a", "proj_b")
+    generate("proj_ns", extra_args=["--namespace", "my.ns"])
+    setup_cfg = Path("proj_a/setup.cfg")
+    updater = ConfigUpdater()
+    updater.read(str(setup_cfg))
+    updater["flake8"]["jobs"] = "4"
+    updater["metadata"]["keywords"] = "custom"
+    updater.remove_section("coverage.paths")
+    setup_cfg.write_text(str(updater))
+    pyproject = Path("proj_a/pyproject.toml")
+    pyproject.write_text(pyproject.read_text().replace("report_top = 10", ""))
+    Path("proj_a/Makefile").unlink()  # not part of the update diff
+
+    exit_code, report = scan_report(capsys, "--update-diff", "--all", "proj_*")
+    assert exit_code == 1
+    assert [r["drifted"] for r in report] == [True, False, False]
+    assert report[0]["setup.cfg"] == {
+        "coverage.paths": {"added": ["source"]},
+        "flake8": {"changed": ["jobs"]},
+        "metadata": {"removed": ["keywords"]},
+    }
+    assert report[0]["pyproject.toml"] == {"tool.importtime": {"added": ["report_top"]}}
+    assert "files" not in report[0]
+    assert not list(Path("proj_a").glob("Makefile"))
+
+
+def test_update_diff_broken_repo(tmpfolder):
+    Path("not_generated").mkdir()
+    Path("not_generated/setup.cfg").write_text("[metadata]\nname = x\n")
+    report = drift.update_diff(Path("not_generated"))
+    assert report["drifted"]
+    assert "error" in report
+
+
+def test_section_diff():
+    actual = {"a": {"x": 1, "y": 2}, "b": {"z": 3}}
+    expected = {"a": {"x": 1, "y": 3, "w": 0}, "c": {"z": 3}}
+    assert drift.section_diff(actual, expected) == {
+        "a": {"added": ["w"], "changed": ["y"]},
+        "b": {"removed": ["z"]},
+        "c": {"added": ["z"]},
+    }
+
+
+def test_rendered():
+    struct = {"a": Template("$x"), "b": None, "c": Deferred(lambda opts: opts["x"])}
+    rendered = [drift.rendered(struct, name, {"x": "1"}) for name in "abc"]
+    assert rendered == ["1", "", "1"]
@@ -0,0 +1,20 @@
+"""Test the opts keys of the provisioning host."""
+
+from configupdater import ConfigUpdater
+from pyscaffold.templates import add_pyscaffold
+
+from pyscaffoldext.jaustinpage.extension import Jaustinpage
+from pyscaffoldext.jaustinpage.host_options import host_key
+
+
+def test_host_key_not_persisted():
+    archive = host_key("archive")
+    assert archive == "_jaustinpage_archive"
+    opts = {
+        "extensions": [Jaustinpage()],
+        "jaustinpage_lazy_init": True,
+        archive: "/srv/projects.zip",
+    }
+    setup_cfg = str(add_pyscaffold(ConfigUpdater(), opts))
+    assert "jaustinpage_lazy_init = True" in setup_cfg
+    assert "archive" not in setup_cfg
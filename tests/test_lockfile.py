@@ -0,0 +1,72 @@
+"""Test scaffold lockfile."""
+from pathlib import Path
+
+from pyscaffold import cli
+from pyscaffold.file_system import chdir
+from pyscaffold.shell import git
+
+from pyscaffoldext.jaustinpage import lockfile
+from pyscaffoldext.jaustinpage.extension import Jaustinpage
+
+EXT_FLAGS = [Jaustinpage().flag]
+
+
+def generate(*extra_args):
+    cli.main(["proj", "--no-config", *extra_args, *EXT_FLAGS])
+    # --no-config: avoid extra config from dev's machine interference
+
+
+def test_lockfile_written(tmpfolder):
+    generate()
+    entries = lockfile.read_lockfile(Path("proj"))
+    assert entries["Makefile"] == [
+        "Makefile",
+        lockfile.template_hash("Makefile"),
+        lockfile.sha256(Path("proj/Makefile").read_text()),
+    ]
+    assert entries["src/proj/__init__.py"][0] == "__init__.py"
+    assert entries["setup.cfg"][:2] == [None, None]
+    assert "tests/test_init.py" not in entries
+    assert set(lockfile.file_status(Path("proj")).values()) == {"pristine"}
+
+
+def test_lockfile_lazy_init(tmpfolder):
+    generate("--jaustinpage-lazy-init")
+    entries = lockfile.read_lockfile(Path("proj"))
+    assert entries["src/proj/__init__.py"][0] == "__init__lazy.py"
+    assert entries["tests/test_init.py"][0] == "test_init.py"
+
+
+def test_file_status(tmpfolder, monkeypatch):
+    generate()
+    with Path("proj/Makefile").open("a") as makefile:
+        makefile.write("custom:\n\techo hi\n")
+    Path("proj/tox.ini").unlink()
+    monkeypatch.setattr(lockfile, "_current_template_hash", lambda name: "changed")
+    status = lockfile.file_status(Path("proj"))
+    assert status["Makefile"] == "modified"
+    assert status["tox.ini"] == "missing"
+    assert status["README.md"] == "outdated"
+    assert status["setup.cfg"] == "pristine"
+
+
+def test_update_keeps_entries(tmpfolder):
+    generate()
+    before = lockfile.read_lockfile(Path("proj"))
+    with Path("proj/Makefile").open("a") as makefile:
+        makefile.write("custom:\n\techo hi\n")
+    with chdir("proj"):
+        git("commit", "-qam", "Customize Makefile")
+    generate("--update")
+    after = lockfile.read_lockfile(Path("proj"))
+    assert after["Makefile"] == before["Makefile"]
+    assert lockfile.file_status(Path("proj"))["Makefile"] == "modified"
+
+
+def test_pretend_writes_no_lockfile(tmpfolder):
+    generate("--pretend")
+    assert not Path("proj", lockfile.LOCKFILE).exists()
+
+
+def test_missing_template():
+    assert lockfile._current_template_hash("not_a_template") is None
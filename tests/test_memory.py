@@ -0,0 +1,72 @@
+"""Test memory report and memory budget mode."""
+import logging
+import tracemalloc
+
+import pytest
+from pyscaffold import api, cli
+
+from pyscaffoldext.jaustinpage import memory
+from pyscaffoldext.jaustinpage.extension import Jaustinpage
+
+
+@pytest.fixture()
+def tracing():
+    was_tracing = tracemalloc.is_tracing()
+    yield
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def generate(name, *extra_args):
+    cli.main([name, "--no-config", *extra_args])
+    # --no-config: avoid extra config from dev's machine interference
+
+
+def test_memory_report(tmpfolder, tracing, caplog):
+    generate("proj", "--jaustinpage-memory-report")
+    report = caplog.records[-1].getMessage()
+    assert "memory of proj:" in report
+    assert "pyscaffold.structure:create_structure" in report
+    assert "pyscaffoldext.jaustinpage.extension:replace_files" in report
+    assert report.splitlines()[-1].endswith("  total")
+    assert "memory" not in open("proj/setup.cfg").read()
+    assert not tracemalloc.is_tracing()
+
+
+def test_no_report_without_option(tmpfolder, tracing, caplog):
+    tracemalloc.start()
+    generate("proj", "--jaustinpage")
+    assert "memory of" not in caplog.text
+
+
+def test_keeps_tracing_started_before(tmpfolder, tracing):
+    tracemalloc.start()
+    generate("proj", "--jaustinpage-memory-report")
+    assert tracemalloc.is_tracing()
+
+
+def test_memory_budget(tmpfolder, tracing, caplog):
+    generate("proj_a", "--jaustinpage-memory-budget", "0.001")
+    assert "memory peak" in caplog.text
+    assert "exceeds the budget of 0.001 MiB" in caplog.text
+    assert "memory of" not in caplog.text
+    assert not tracemalloc.is_tracing()
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        generate("proj_b", "--jaustinpage-memory-budget", "1000")
+    assert "memory peak" not in caplog.text
+
+
+@pytest.mark.parametrize("budget", [None, 1000])
+def test_release_project(tmpfolder, tracing, budget):
+    opts = {
+        "project_path": "proj",
+        "config_files": api.NO_CONFIG,
+        "extensions": [Jaustinpage()],
+        memory.MEMORY_BUDGET: budget,
+    }
+    struct, _ = api.create_project(opts)
+    if budget:
+        assert struct == {}
+    else:
+        assert struct["Makefile"].startswith(".PHONY")
@@ -0,0 +1,84 @@
+"""Test scaffolding metrics."""
+import json
+from pathlib import Path
+
+import pytest
+from pyscaffold import cli
+
+from pyscaffoldext.jaustinpage import metrics
+from pyscaffoldext.jaustinpage.extension import Jaustinpage
+from pyscaffoldext.jaustinpage.lockfile import read_lockfile
+
+EXT_FLAGS = [Jaustinpage().flag]
+
+
+@pytest.fixture()
+def exports(monkeypatch):
+    for counter in metrics.COUNTERS:
+        monkeypatch.setattr(counter, "value", 0)
+    monkeypatch.setattr(metrics.ACTION_SECONDS, "series", {})
+    monkeypatch.setattr(metrics, "_EXPORTS", set())
+    registered = []
+    monkeypatch.setattr(metrics.atexit, "register", lambda *a: registered.append(a))
+    return registered
+
+
+def generate(name, *extra_args):
+    cli.main([name, "--no-config", *extra_args])
+    # --no-config: avoid extra config from dev's machine interference
+
+
+def test_metrics_collected(tmpfolder, exports):
+    generate("proj_a", "--jaustinpage-metrics", "metrics.json")
+    generate("proj_b", "--jaustinpage-metrics", "metrics.json")
+    generate("proj_b", "--update", *EXT_FLAGS)
+    generate("proj_c", "--pretend", *EXT_FLAGS)
+    assert exports == [(metrics.export, Path("metrics.json").resolve())]
+    assert "metrics" not in Path("proj_a/setup.cfg").read_text()
+
+    values = metrics.snapshot()
+    assert values["jaustinpage_projects_generated_total"] == 3
+    written = values["jaustinpage_files_written_total"]
+    skipped = values["jaustinpage_files_skipped_total"]
+    managed = len(read_lockfile(Path("proj_a")))
+    assert written + skipped == 3 * managed  # --pretend writes and skips nothing
+    assert skipped == managed - 2  # on update, __init__.py and docs/conf.py are written
+    assert values["jaustinpage_bytes_written_total"] > 40_000 * 2
+    actions = values["jaustinpage_action_duration_seconds"]
+    assert set(actions) == {
+        "add_files",
+        "configure_coveragerc",
+        "configure_docs_conf",
+        "configure_pyproject_toml",
+        "configure_setup_cfg",
+        "regular_namespace",
+        "replace_files",
+    }
+    assert actions["add_files"]["count"] == 4
+    assert actions["configure_setup_cfg"]["count"] == 3  # not rendered with --pretend
+
+    metrics.export(Path("metrics.json").resolve())
+    assert json.loads(Path("metrics.json").read_text()) == values
+
+
+def test_prometheus_export(tmpfolder, exports):
+    generate("proj_a", "--jaustinpage-metrics", "out/metrics.prom")
+    metrics.export(*exports[0][1:])
+    lines = Path("out/metrics.prom").read_text().splitlines()
+    assert "jaustinpage_projects_generated_total 1" in lines
+    assert "# TYPE jaustinpage_action_duration_seconds histogram" in lines
+    series = 'jaustinpage_action_duration_seconds_{0}{{action="add_files"{1}}} 1'
+    assert series.format("bucket", ',le="+Inf"') in lines
+    assert series.format("count", "") in lines
+    assert list(Path("out").iterdir()) == [Path("out/metrics.prom")]
+
+
+def test_histogram_buckets(exports):
+    metrics.ACTION_SECONDS.observe("action", 0.003)
+    metrics.ACTION_SECONDS.observe("action", 2.0)
+    series = metrics.snapshot()["jaustinpage_action_duration_seconds"]["action"]
+    assert series["buckets"]["0.0025"] == 0
+    assert series["buckets"]["0.005"] == 1
+    assert series["buckets"]["1.0"] == 1
+    assert series["count"] == 2
+    assert series["sum"] == pytest.approx(2.003)
@@ -0,0 +1,107 @@
+"""Test the preflight checks of templates and targets."""
+from pathlib import Path
+
+import pytest
+from pyscaffold import cli
+from pyscaffold.exceptions import NestedRepository
+from pyscaffold.shell import git
+
+from pyscaffoldext.jaustinpage import preflight
+from pyscaffoldext.jaustinpage.extension import Jaustinpage
+
+
+def generate(name, *extra_args):
+    cli.main([name, "--no-config", *extra_args])
+    # --no-config: avoid extra config from dev's machine interference
+
+
+def add_missing_key(monkeypatch):
+    index = preflight.placeholder_index()
+    skeleton = index["skeleton.py"].union({"licence_holder"})
+    monkeypatch.setattr(
+        preflight, "placeholder_index", lambda: {**index, "skeleton.py": skeleton}
+    )
+
+
+def project(name, **opts):
+    return {"project_path": name, "extensions": [Jaustinpage()], **opts}
+
+
+def test_placeholder_index():
+    index = preflight.placeholder_index()
+    assert index["gitignore"] == {"py"}
+    assert index["Makefile"] == set()
+    assert "qual_pkg" in index["skeleton.py"]
+
+
+def test_missing_key_fails_before_writing(tmpfolder, monkeypatch):
+    add_missing_key(monkeypatch)
+    with pytest.raises(preflight.PreflightError) as error:
+        generate("proj", "--jaustinpage")
+    assert error.value.problems == [
+        "proj/src/proj/skeleton.py: skeleton.py misses licence_holder"
+    ]
+    assert not Path("proj").exists()
+
+
+def test_generated_project_passes(tmpfolder):
+    generate("proj", "--jaustinpage", "--jaustinpage-lazy-init")
+    assert Path("proj/tests/test_init.py").exists()
+
+
+def test_batch(tmpfolder, monkeypatch):
+    generate("alpha", "--jaustinpage")
+    add_missing_key(monkeypatch)
+    batch = [
+        project("alpha"),
+        project("beta"),
+        project("beta", force=True),
+        project("gamma", update=True),
+    ]
+    with pytest.raises(preflight.PreflightError, match="preflight check failed") as e:
+        preflight.preflight(batch)
+    assert e.value.problems == [
+        "alpha already exists, use update or force",
+        "alpha/src/alpha/skeleton.py: skeleton.py misses licence_holder",
+        "beta/src/beta/skeleton.py: skeleton.py misses licence_holder",
+        "beta appears twice in the batch",
+        "beta/src/beta/skeleton.py: skeleton.py misses licence_holder",
+        "gamma: Could not update project. Was it generated with PyScaffold?",
+    ]
+    assert not Path("beta").exists()
+
+
+def test_batch_passes_without_writing(tmpfolder):
+    generate("alpha", "--jaustinpage")
+    batch = [project("alpha", update=True), project("beta"), project("gamma")]
+    batch.append({"project_path": "plain", "extensions": []})
+    preflight.preflight(batch)
+    assert sorted(path.name for path in Path().iterdir()) == ["alpha"]
+
+
+def test_target_problems(tmpfolder):
+    Path("existing").mkdir()
+    opts = {"update": False, "force": False}
+    existing = {**opts, "project_path": "existing"}
+    missing = {**opts, "project_path": "missing"}
+    assert preflight.target_problems(existing) == [
+        "existing already exists, use update or force"
+    ]
+    assert preflight.target_problems({**existing, "update": True}) == []
+    assert preflight.target_problems({**existing, "force": True}) == []
+    assert preflight.target_problems({**missing, "update": True}) == [
+        "missing does not exist and thus cannot be updated"
+    ]
+    assert preflight.target_problems(missing) == []
+
+
+def test_nested_repository(tmpfolder):
+    git("init")
+    with pytest.raises(preflight.PreflightError) as error:
+        preflight.preflight([project("nested")])
+    assert error.value.problems == [
+        f"nested would be nested in the git repository {tmpfolder.resolve()}, use force"
+    ]
+    with pytest.raises(NestedRepository):
+        generate("nested", "--jaustinpage")  # putup refuses it as well
+    preflight.preflight([project("nested", force=True)])
@@ -0,0 +1,111 @@
+"""Test compiled templates."""
+from copy import deepcopy
+from pathlib import Path
+from string import Template
+
+import pytest
+
+from pyscaffoldext.jaustinpage import templates
+from pyscaffoldext.jaustinpage.memory import MEMORY_BUDGET
+from pyscaffoldext.jaustinpage.render import (
+    CompiledTemplate,
+    Deferred,
+    deferred,
+    resolve_deferred,
+)
+
+TEMPLATE_NAMES = sorted(
+    path.name[: -len(".template")]
+    for path in Path(templates.__file__).parent.glob("*.template")
+)
+
+
+@pytest.mark.parametrize("name", TEMPLATE_NAMES)
+def test_same_as_template(name):
+    source = templates.template(name)
+    compiled = templates.compiled(name)
+    opts = {key: f"<{key}>" for key in compiled.placeholders}
+    assert compiled(opts) == source.safe_substitute(opts)
+    assert compiled({}) == source.safe_substitute({})
+    try:
+        expected = source.substitute(opts)
+    except ValueError as ex:
+        with pytest.raises(ValueError, match=str(ex)):
+            compiled.render(opts)
+    else:
+        assert compiled.render(opts) == expected
+
+
+def test_segments():
+    compiled = CompiledTemplate(Template("$a costs $$${b}, $a"))
+    assert compiled.placeholders == {"a", "b"}
+    assert compiled.segments == ["", "$a", " costs $", "${b}", ", ", "$a", ""]
+    assert compiled.render({"a": "tea", "b": 2}) == "tea costs $2, tea"
+
+
+def test_missing_keys():
+    with pytest.raises(KeyError, match="a, b"):
+        CompiledTemplate(Template("$b $a $c"), keys=["c"])
+    compiled = CompiledTemplate(Template("$b $a"), keys=["a", "b", "c"])
+    assert compiled.missing(["a"]) == ["b"]
+    with pytest.raises(KeyError, match="b"):
+        compiled.render({"a": 1})
+    assert compiled({"a": 1}) == "$b 1"
+
+
+def test_invalid_placeholder():
+    compiled = CompiledTemplate(Template("ok\n  $1 $a"))
+    assert compiled({"a": 2}) == "ok\n  $1 2"
+    with pytest.raises(ValueError, match="line 2, col 3"):
+        compiled.render({"a": 2})
+    with pytest.raises(ValueError, match="line 1, col 1"):
+        CompiledTemplate(Template("$1")).render_many([{}])
+
+
+def test_render_many():
+    compiled = CompiledTemplate(Template("$a-$b"))
+    many = [{"a": 1, "b": 2}, {"a": 3, "b": 4, "c": 5}]
+    assert compiled.render_many(iter(many)) == ["1-2", "3-4"]
+    with pytest.raises(KeyError, match="b"):
+        compiled.render_many([{"a": 1, "b": 2}, {"a": 3}])
+
+
+def test_compiled_once():
+    assert templates.compiled("README.md") is templates.compiled("README.md")
+
+
+def test_deepcopy_shares_template():
+    leaf = (Deferred(templates.compiled("Makefile"), "Makefile"), None)
+    copied = deepcopy({"Makefile": leaf})["Makefile"][0]
+    assert copied is not leaf[0]
+    assert copied.render is templates.compiled("Makefile")
+    assert copied.template_name == "Makefile"
+
+
+def test_deferred(tmp_path):
+    written = {}
+
+    def _file_op(path, contents, opts):
+        written[path.name] = contents
+        return path
+
+    content = Deferred(lambda opts: opts["text"])
+    file_op = deferred(_file_op)
+    struct = {"a": content, "b": "plain", "c": None}
+    assert "Deferred(<function" in repr(content)
+
+    assert file_op(tmp_path / "a", content, {"text": "x", "pretend": True})
+    assert written == {"a": ""}
+    assert resolve_deferred(struct, {}) == ({"a": None, "b": "plain", "c": None}, {})
+
+    assert file_op(tmp_path / "a", content, {"text": "x"})
+    assert file_op(tmp_path / "b", "plain", {"text": "x"})
+    assert written == {"a": "x", "b": "plain"}
+    assert resolve_deferred({"dir": struct}, {})[0] == {
+        "dir": {"a": "x", "b": "plain", "c": None}
+    }
+
+    content = Deferred(lambda opts: opts["text"])
+    assert file_op(tmp_path / "a", content, {"text": "y", MEMORY_BUDGET: 1000})
+    assert written["a"] == "y"
+    assert content.content is None
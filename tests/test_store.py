@@ -0,0 +1,107 @@
+"""Test the content store of the files shared by every project."""
+import errno
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from pyscaffold import cli
+
+from pyscaffoldext.jaustinpage import lockfile, store
+from pyscaffoldext.jaustinpage.templates import compiled
+
+HARDLINKS = "--jaustinpage-content-store-hardlinks"
+SHARED = ["Makefile", ".gitignore", ".run/all.run.xml", "scripts/test_impact.py"]
+OWN = [".run/tox.run.xml", "README.md", "setup.cfg"]
+
+
+def generate(name, *extra_args):
+    cli.main([name, "--no-config", "--jaustinpage-content-store", "store", *extra_args])
+    # --no-config: avoid extra config from dev's machine interference
+
+
+def blob_of(path):
+    digest = lockfile.sha256(Path(path).read_text())
+    return Path("store", digest[:2], digest)
+
+
+def no_reflinks(source, target):
+    raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+
+def test_shared_files_copied(tmpfolder, monkeypatch):
+    monkeypatch.setattr(store, "_clone", no_reflinks)
+    generate("proj_a")
+    blob = blob_of("proj_a/Makefile")
+    assert not os.path.samefile("proj_a/Makefile", blob)
+    assert os.access("proj_a/Makefile", os.W_OK)
+    assert Path("proj_a/Makefile").read_bytes() == blob.read_bytes()
+
+
+def test_shared_files_hardlinked(tmpfolder, monkeypatch):
+    monkeypatch.setattr(store, "_clone", no_reflinks)
+    generate("proj_a", HARDLINKS)
+    generate("proj_b", HARDLINKS)
+    for path in SHARED:
+        blob = blob_of(f"proj_a/{path}")
+        assert os.path.samefile(f"proj_a/{path}", blob)
+        assert os.path.samefile(f"proj_b/{path}", blob)
+        assert blob.stat().st_mode & 0o777 == store.BLOB_MODE
+    for path in OWN:
+        assert os.stat(f"proj_a/{path}").st_nlink == 1
+    assert Path("proj_a/Makefile").read_text() == compiled("Makefile")({})
+    assert set(lockfile.file_status(Path("proj_a")).values()) == {"pristine"}
+    assert "store" not in Path("proj_a/setup.cfg").read_text()
+
+
+def test_rewrite_unlinks(tmpfolder, monkeypatch):
+    monkeypatch.setattr(store, "_clone", no_reflinks)
+    generate("proj_a", HARDLINKS)
+    generate("proj_b", HARDLINKS)
+    blob = blob_of("proj_a/Makefile")
+    cli.main(["proj_a", "--no-config", "--jaustinpage", "--force"])
+    assert os.stat("proj_a/Makefile").st_nlink == 1
+    assert os.path.samefile("proj_b/Makefile", blob)
+    generate("proj_a", HARDLINKS, "--force")
+    assert os.path.samefile("proj_a/Makefile", blob)
+    generate("proj_b", HARDLINKS, "--force")
+    assert os.path.samefile("proj_b/Makefile", blob)
+    assert blob.stat().st_nlink == 3
+
+
+def test_reflink(tmpfolder, monkeypatch):
+    monkeypatch.setattr(store, "_clone", shutil.copyfileobj)
+    generate("proj_a")
+    blob = blob_of("proj_a/Makefile")
+    assert not os.path.samefile("proj_a/Makefile", blob)
+    assert os.access("proj_a/Makefile", os.W_OK)
+    assert Path("proj_a/Makefile").read_bytes() == blob.read_bytes()
+
+
+def test_copy_across_filesystems(tmpfolder, monkeypatch):
+    def cross_device(source, target):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(store, "_clone", no_reflinks)
+    monkeypatch.setattr(os, "link", cross_device)
+    source = store.blob(Path("store"), "content\n")
+    assert store.link(source, Path("copy"), hardlinks=True) == "copy"
+    assert Path("copy").read_text() == "content\n"
+    assert os.stat("copy").st_nlink == 1
+
+
+@pytest.mark.parametrize("fcntl", [store.fcntl, None])
+def test_link(tmpfolder, monkeypatch, fcntl):
+    monkeypatch.setattr(store, "fcntl", fcntl)
+    source = store.blob(Path("store"), "content\n")
+    assert store.blob(Path("store"), "content\n") == source
+    assert store.link(source, Path("linked"), hardlinks=True) in {"reflink", "hardlink"}
+    assert Path("linked").read_text() == "content\n"
+    assert store.link(source, Path("copied")) in {"reflink", "copy"}
+    assert not os.path.samefile("copied", source)
+    assert not list(source.parent.glob(".*"))  # no temporary file left
+
+
+def test_pretend(tmpfolder):
+    generate("proj_a", "--pretend")
+    assert not Path("store").exists()
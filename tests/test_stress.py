@@ -0,0 +1,202 @@
+"""Stress the extension with large and unusual inputs, to find performance cliffs.
+
+Hypothesis generates deep namespaces, long package names and big ``setup.cfg`` and
+``pyproject.toml`` files with many sections. Each example runs on its input and on the
+input repeated :data:`SCALE` times, and the scaled run must cost less than
+:data:`RATIO` times as much time and memory: linear code costs 4 times as much,
+quadratic code 16 times. Comparing two runs on the same machine and tracer keeps slow
+and coverage-traced runs green.
+"""
+import gc
+import keyword
+import shutil
+import string
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+
+import toml
+from configupdater import ConfigUpdater
+from hypothesis import HealthCheck, given, settings
+from hypothesis import strategies as st
+from pyscaffold import actions, api
+from pyscaffold import templates as pyscaffold_templates
+from pyscaffold.extensions.namespace import Namespace
+
+from pyscaffoldext.jaustinpage import extension, memory
+from pyscaffoldext.jaustinpage.extension import Jaustinpage
+
+SCALE = 4
+RATIO = 8
+# ^  Bound of the cost of a run on the input scaled by SCALE, against the run on the
+#    input. Doubling the input would leave too little margin for the timing noise.
+REPEAT = 3
+# ^  Timed runs of each input, the fastest counts: the first run also pays for imports.
+
+STRESS = settings(
+    max_examples=10,
+    deadline=None,  # the runs are compared with each other instead
+    suppress_health_check=[HealthCheck.too_slow, HealthCheck.data_too_large],
+)
+
+identifiers = st.text(string.ascii_lowercase, min_size=1, max_size=20).map(
+    lambda name: f"x{name}"
+)
+CONTINUATION = "\n    "
+# ^  Separator of the lines of multi-line setup.cfg values.
+values = st.text(string.ascii_letters + string.digits + " ._-/:*", max_size=60)
+
+
+class Usage(NamedTuple):
+    """Wall time and traced memory peak of a run, with its result."""
+
+    seconds: float
+    peak: int
+    result: Any
+
+
+def measure(run: Callable[[], Any]) -> Usage:
+    """Run timed, then once traced, since tracing slows the run down.
+
+    Like :mod:`timeit`, the timed runs disable the garbage collector, whose collections
+    depend on everything else the process allocated.
+    """
+    seconds = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            result = run()
+            seconds = min(seconds, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        memory._reset_peak()
+        run()
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return Usage(seconds, peak, result)
+
+
+def assert_linear(usage: Usage, scaled: Usage) -> None:
+    """Check that the run on the scaled input costs less than ``RATIO`` times more."""
+    assert scaled.seconds < RATIO * usage.seconds, (usage[:2], scaled[:2])
+    assert scaled.peak < RATIO * usage.peak, (usage[:2], scaled[:2])
+
+
+def scaffold_opts(**opts: object) -> actions.ScaffoldOpts:
+    """Scaffold options with PyScaffold's defaults, as the configure functions get."""
+    opts = {"project_path": "my_project", "config_files": api.NO_CONFIG, **opts}
+    return actions.get_default_options({}, opts)[1]
+
+
+@st.composite
+def setup_cfgs(draw: st.DrawFn) -> Callable[[int], str]:
+    """PyScaffold's setup.cfg followed by many, possibly multi-line, sections.
+
+    :returns: the setup.cfg for a multiple of the drawn number of extra sections
+    """
+    options = draw(st.dictionaries(identifiers, st.lists(values, max_size=4)))
+    section = "".join(
+        f"{key} = {CONTINUATION.join(lines)}\n" for key, lines in options.items()
+    )
+    count = draw(st.integers(50, 250))
+    setup_cfg = pyscaffold_templates.setup_cfg(scaffold_opts())
+    return lambda scale: setup_cfg + "".join(
+        f"\n[x-section-{i}]\n{section}" for i in range(count * scale)
+    )
+
+
+@st.composite
+def pyproject_tomls(draw: st.DrawFn) -> Callable[[int], str]:
+    """PyScaffold's pyproject.toml followed by many tool tables.
+
+    :returns: the pyproject.toml for a multiple of the drawn number of tool tables
+    """
+    table = draw(
+        st.dictionaries(
+            identifiers,
+            values | st.integers() | st.lists(values, max_size=8),
+            max_size=8,
+        )
+    )
+    count = draw(st.integers(50, 150))
+    pyproject_toml = pyscaffold_templates.pyproject_toml(scaffold_opts())
+
+    def content(scale: int) -> str:
+        tools = {
+            f"x-tool-{i}": {**table, "nested": dict(table)}
+            for i in range(count * scale)
+        }
+        return pyproject_toml + "\n" + toml.dumps({"tool": tools})
+
+    return content
+
+
+@STRESS
+@given(content=setup_cfgs())
+def test_configure_setup_cfg(content):
+    opts = scaffold_opts()
+    usage, scaled = (
+        measure(lambda: extension.configure_setup_cfg(content(scale), opts))
+        for scale in (1, SCALE)
+    )
+    assert ConfigUpdater().read_string(usage.result).has_section("coverage.report")
+    assert_linear(usage, scaled)
+
+
+@STRESS
+@given(content=pyproject_tomls())
+def test_configure_pyproject_toml(content):
+    opts = scaffold_opts()
+    usage, scaled = (
+        measure(lambda: extension.configure_pyproject_toml(content(scale), opts))
+        for scale in (1, SCALE)
+    )
+    assert toml.loads(usage.result)["tool.black"] == {"line-length": 88}
+    assert_linear(usage, scaled)
+
+
+packages = st.text(string.ascii_lowercase + "_", min_size=1, max_size=60).map(
+    lambda name: f"p{name}"
+)
+
+
+@settings(
+    STRESS,
+    max_examples=5,
+    suppress_health_check=[
+        *STRESS.suppress_health_check,
+        HealthCheck.function_scoped_fixture,  # each example generates the project again
+    ],
+)
+@given(
+    levels=st.lists(identifiers, min_size=1, max_size=20),
+    package=packages.filter(lambda name: not keyword.iskeyword(name)),
+)
+def test_replace_files(tmpfolder, levels, package):
+    def generate(scale):
+        opts = {
+            "project_path": "my_project",
+            "package": package * scale,
+            "namespace": ".".join(levels * scale),
+            "config_files": api.NO_CONFIG,
+            "extensions": [Namespace(), Jaustinpage()],
+        }
+        shutil.rmtree("my_project", ignore_errors=True)
+        api.create_project(opts)  # replace_files and the configure functions
+        package_dir = Path("my_project", "src", *levels * scale, package * scale)
+        return (package_dir / "skeleton.py").exists()
+
+    usage, scaled = (measure(lambda: generate(scale)) for scale in (1, SCALE))
+    assert usage.result
+    assert scaled.result
+    assert_linear(usage, scaled)
@@ -0,0 +1,61 @@
+"""Test the template watch script."""
+import runpy
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).parents[1] / "scripts" / "watch_templates.py"
+
+
+@pytest.fixture()
+def script():
+    return runpy.run_path(str(SCRIPT))
+
+
+@pytest.fixture()
+def sample(tmpfolder, script):
+    opts = script["generate"](Path("sample"), [])
+    return Path("sample"), opts
+
+
+def test_outputs_by_template(script, sample):
+    outputs = script["outputs_by_template"](sample[0])
+    assert outputs["Makefile"] == ["Makefile"]
+    assert "setup.cfg" not in {path for paths in outputs.values() for path in paths}
+
+
+def test_rerender(script, sample, capsys):
+    path, opts = sample
+    template = Path("Makefile.template")
+    shutil.copyfile(script["TEMPLATES_DIR"] / template, template)
+    with template.open("a") as template_file:
+        template_file.write("# ${name}\n")
+    script["rerender"](path, ["Makefile"], template, opts)
+    out = capsys.readouterr().out
+    assert "--- a/Makefile\n+++ b/Makefile\n" in out
+    assert "\n+# sample\n" in out
+    assert out.endswith("re-rendered Makefile from Makefile.template\n")
+    assert (path / "Makefile").read_text().endswith("# sample\n")
+
+
+def test_watch(script, sample, monkeypatch, capsys):
+    path, opts = sample
+    templates = Path("templates")
+    templates.mkdir()
+    for name in ["Makefile.template", "LICENSE.template"]:
+        shutil.copyfile(script["TEMPLATES_DIR"] / name, templates / name)
+
+    def edit(interval):
+        for name in ["Makefile.template", "LICENSE.template"]:
+            with (templates / name).open("a") as template_file:
+                template_file.write("# edited\n")
+
+    monkeypatch.setitem(script["watch"].__globals__, "TEMPLATES_DIR", templates)
+    monkeypatch.setattr(time, "sleep", edit)
+    script["watch"](path, opts, 0, polls=1)
+    out = capsys.readouterr().out
+    assert "re-rendered Makefile from Makefile.template" in out
+    assert "LICENSE.template changed, no file of the sample uses it" in out
+    assert (path / "Makefile").read_text().endswith("# edited\n")